@@ -1,7 +1,9 @@
+from src.config import configure_logging
 from src.predictions_updater import update
 from src.scheduler import main
 
 
 
 if __name__ == "__main__":
+    configure_logging()
     update()
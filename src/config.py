@@ -2,8 +2,10 @@
 import os
 
 import logging
-import gspread
 
+# Heavy libraries (gspread, pandas, the scraping stack) are imported by the modules that
+# use them, not here: every entry point imports config, including the scheduler's quick
+# status command.
 
 ## Google Sheets secret key import.
 from secrets2.ss_key import sskey
@@ -11,13 +13,14 @@ sskey=sskey
 
 ## LOGGER ##
 
-logging.basicConfig(
-    level=logging.INFO, #NOTE INFO / DEBUG to change functionality #
-    format="%(asctime)s [%(levelname)s] %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 
+def configure_logging(level: int = logging.INFO) -> None: #NOTE INFO / DEBUG to change functionality #
+    """Set up console logging; called by entry points rather than on import."""
+    logging.basicConfig(level=level, format="%(asctime)s [%(levelname)s] %(message)s")
+
+
 ## Local Files ## 
 
 # Authorization
@@ -25,24 +28,66 @@ ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 CREDS = os.path.join(ROOT_DIR, r"secrets2/creds.json")
 
 
-def authorize_google_sheet(creds: str, sheet_key: str) -> gspread.Spreadsheet:
+def authorize_google_sheet(creds: str, sheet_key: str) -> "gspread.Spreadsheet":
     """Authorize access to a Google Sheet using a service account."""
+    import gspread
     return gspread.service_account(filename=creds).open_by_key(sheet_key)
 
 JSON_FILE = "race_schedule.json"
 
+# Local caches (HTTP pages etc.)
+CACHE_DIR = os.path.join(ROOT_DIR, ".cache")
+HTTP_CACHE_DIR = os.path.join(CACHE_DIR, "http")
+TABLE_STORE_DIR = os.path.join(CACHE_DIR, "tables")  # Parsed tables, memory-mapped on load.
+
 ## Scheduler perameters ##
 
 OFFSET_HOURS = 1           # Window starts 1 hour after race start.
 UPDATE_WINDOW_HOURS = 3   # The update window lasts 3 hours.
-UPDATE_INTERVAL = 5 * 60  # When in window, run updater every 5 minutes.
+UPDATE_INTERVAL = 5 * 60  # When in window, run updater every 5 minutes (and the slowest results poll).
+POLL_MIN_INTERVAL = 30    # Results poll interval around the expected publish time.
+POLL_BACKOFF = 1.5        # Poll interval growth per miss once results are overdue.
+STATE_RECHECK_HOURS = 24  # Trust the local scheduler state this long before re-reading the sheet.
+
+## Scraping parameters ##
+
+FETCH_MAX_PER_HOST = 6    # Pooled connections / in-flight requests per host.
+FETCH_WORKERS = 12        # Threads used when fetching a list of pages.
+FETCH_TIMEOUT = 30        # Seconds before a page request is abandoned.
+FETCH_USER_AGENT = "Mozilla/5.0 (compatible; f1-predictions-updater)"
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Size bound for cached page bodies.
+RESULTS_FINAL_HOURS = 48  # Results/qualifying pages are treated as final this long after the race.
+SCHEDULE_REFRESH_DAYS = 7 # Re-scrape an upcoming race's details when older than this.
+
+## Update parameters ##
+
+TASK_WORKERS = 6          # Update tasks (scrapes, computations, sheet writes) running at once.
+SHEET_WORKERS = 4         # League worksheets updated at once from the shared season data.
+TOKEN_REFRESH_MARGIN = 5 * 60  # Refresh the Sheets access token this many seconds before expiry.
+
+# Sheets API quota (per user per minute), shared by every league and thread.
+SHEETS_READS_PER_MINUTE = 60
+SHEETS_WRITES_PER_MINUTE = 60
+SHEETS_BURST = 10          # Requests that may go back to back before the limiter paces them.
+SHEETS_RETRIES = 5         # Retries of a throttled (429), timed out or 5xx request before it is raised.
+SHEETS_BACKOFF_BASE = 1.0  # Seconds before the first retry, doubling each time...
+SHEETS_BACKOFF_MAX = 64.0  # ...up to this.
 
 
 ### Game Details ###
 YEAR = 2025
+WILDCARD_CHECKPOINT = os.path.join(CACHE_DIR, f"wildcards_{YEAR}.json")
+SCHEDULER_STATE = os.path.join(CACHE_DIR, f"scheduler_{YEAR}.json")
+RESULTS_LATENCY_LOG = os.path.join(CACHE_DIR, "results_latency.jsonl")
+PERF_LOG = os.path.join(CACHE_DIR, "perf_runs.jsonl")         # One JSON report per update run.
+PERF_TEXTFILE = os.path.join(CACHE_DIR, "f1_predictions.prom")  # Prometheus textfile; point at the node_exporter textfile directory.
 PLAYERS = ["Tim", "Freya", "Tom", "Shaun"]
 SHEETS = {0: "25 Season Post-Testing"}
 
+# Every league updated each run: spreadsheet key -> {worksheet index: name}.
+# Add further spreadsheets here; all of them share one set of scrapes per run.
+LEAGUES = {sskey: SHEETS}
+
 
 CURRENT_SHEET = list(SHEETS.keys())[0] # DOn't like this but works for now
 
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP fetch engine for scraping the F1 website.
+
+Every scraper goes through the same pooled client, which:
+    keeps keep-alive (and TLS) connections open per host,
+    requests gzip-compressed bodies,
+    caps the number of in-flight requests per host,
+    can fetch a list of URLs in parallel,
+    and keeps an on-disk cache of pages, revalidated with conditional requests.
+
+Within an update run, run_cached() adds a single-flight cache so that stages asking
+for the same page (or parsed table) at the same time share one fetch and parse.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import urllib3
+
+from config import *
+from perf import PERF
+
+
+class FetchError(Exception):
+    """
+    Raised when a page cannot be fetched (connection failure or HTTP error status).
+
+    Attributes:
+        status (Optional[int]): The HTTP status, or None if no response was received.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class HTTPCache:
+    """
+    Size-bounded on-disk cache of fetched pages.
+
+    Each entry is a body file plus a JSON sidecar holding the URL, ETag,
+    Last-Modified and the time it was stored. Entries are evicted least recently
+    used first once the bodies exceed max_bytes.
+
+    A page is served without touching the network when final_after(url) gives a
+    time that has passed and the entry was stored after it, e.g. the results of a
+    completed raceweek. Other pages are revalidated with a conditional request.
+
+    Attributes:
+        directory (str): Where entries are stored.
+        max_bytes (int): Size bound for the stored bodies.
+        final_after (Callable): Maps a URL to the datetime after which its content no longer changes, or None.
+        hits (int): Pages served from disk without a request.
+        revalidated (int): Pages served from disk after a 304 Not Modified.
+        misses (int): Pages downloaded in full.
+    """
+
+    def __init__(self,
+                 directory: str = HTTP_CACHE_DIR,
+                 max_bytes: int = HTTP_CACHE_MAX_BYTES,
+                 final_after: Optional[Callable[[str], Optional[datetime]]] = None) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.final_after = final_after
+        self.hits = self.revalidated = self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._sizes = {name[:-5]: os.path.getsize(os.path.join(directory, name))
+                       for name in os.listdir(directory) if name.endswith(".body")}
+
+    def __repr__(self) -> str:
+        return f"HTTPCache(directory={self.directory!r}, entries={len(self._sizes)}, {self.stats()})"
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return os.path.join(self.directory, key + ".body"), os.path.join(self.directory, key + ".json")
+
+    def get(self, url: str) -> Optional[Tuple[dict, bytes]]:
+        """Return (metadata, body) for a cached URL, or None."""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        os.utime(body_path)  # Mark as recently used for eviction.
+        return meta, body
+
+    def is_final(self, url: str, meta: dict) -> bool:
+        """Return True if a cached entry can be served without revalidating it."""
+        final_after = self.final_after(url) if self.final_after else None
+        return bool(final_after) and meta["stored_at"] > final_after.timestamp() # type: ignore
+
+    def _write(self, path: str, data, mode: str) -> None:
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, mode) as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def put(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Store a page body with its validators, then evict old entries if over the size bound."""
+        body_path, meta_path = self._paths(url)
+        meta = {"url": url, "etag": etag, "last_modified": last_modified, "stored_at": time.time()}
+        self._write(body_path, body, "wb")
+        self._write(meta_path, json.dumps(meta), "w")
+        with self._lock:
+            self._sizes[os.path.basename(body_path)[:-5]] = len(body)
+        self.evict()
+
+    def refresh(self, url: str, meta: dict, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """
+        Mark a cached entry as confirmed current (after a 304), taking any new validators.
+        The body is unchanged, but stored_at moves on, so the page can become final.
+        """
+        meta = {**meta, "etag": etag or meta.get("etag"),
+                "last_modified": last_modified or meta.get("last_modified"), "stored_at": time.time()}
+        self._write(self._paths(url)[1], json.dumps(meta), "w")
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the stored bodies fit in max_bytes."""
+        with self._lock:
+            total = sum(self._sizes.values())
+            if total <= self.max_bytes:
+                return
+            def last_used(key: str) -> float:
+                try:
+                    return os.path.getmtime(os.path.join(self.directory, key + ".body"))
+                except OSError:
+                    return 0.0
+            for key in sorted(self._sizes, key=last_used):
+                if total <= self.max_bytes:
+                    break
+                for ext in (".body", ".json"):
+                    try:
+                        os.remove(os.path.join(self.directory, key + ext))
+                    except OSError:
+                        pass
+                total -= self._sizes.pop(key)
+                logger.debug("Evicted cached page %s", key)
+
+    def record(self, outcome: str) -> None:
+        """Count a lookup outcome: 'hits', 'revalidated' or 'misses'."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> dict:
+        """Return the hit/miss counters and the share of pages served from disk."""
+        served = self.hits + self.revalidated
+        total = served + self.misses
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses,
+                "hit_rate": round(served / total, 3) if total else 0.0}
+
+
+class FetchEngine:
+    """
+    Pooled HTTP client used by all scrapers.
+
+    urllib3's PoolManager keeps one connection pool per host. With block=True a pool
+    never opens more than max_per_host connections, so it doubles as the per-host
+    in-flight limit: extra requests wait for a free connection.
+
+    Attributes:
+        max_per_host (int): Maximum pooled connections, and concurrent requests, per host.
+        max_workers (int): Threads used by map.
+        cache (Optional[HTTPCache]): On-disk page cache, or None to always download.
+    """
+
+    def __init__(self,
+                 max_per_host: int = FETCH_MAX_PER_HOST,
+                 max_workers: int = FETCH_WORKERS,
+                 timeout: float = FETCH_TIMEOUT,
+                 cache: Optional[HTTPCache] = None) -> None:
+        self.max_per_host = max_per_host
+        self.max_workers = max_workers
+        self.cache = cache
+        self.pool = urllib3.PoolManager(
+            num_pools=10,
+            maxsize=max_per_host,
+            block=True,
+            headers={"Accept-Encoding": "gzip", "User-Agent": FETCH_USER_AGENT},
+            timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+        )
+
+    def __repr__(self) -> str:
+        return f"FetchEngine(max_per_host={self.max_per_host}, max_workers={self.max_workers})"
+
+    def fetch(self, url: str) -> bytes:
+        """
+        Fetch a URL and return its (decompressed) body, using the cache when one is set.
+
+        Raises:
+            FetchError: If the request fails or returns an error status.
+        """
+        cached = self.cache.get(url) if self.cache else None
+        headers = {}
+        if cached:
+            meta, body = cached
+            if self.cache.is_final(url, meta): # type: ignore
+                self.cache.record("hits") # type: ignore
+                PERF.count("http_cache_hits")
+                return body
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = self.pool.request("GET", url, headers={**self.pool.headers, **headers})
+        except urllib3.exceptions.HTTPError as e:
+            raise FetchError(f"Request to {url} failed: {e}") from e
+        PERF.count("http_requests")
+        # Bytes on the wire: tell() counts the body as received, before gzip is decoded.
+        PERF.count("http_bytes", response.tell())
+
+        if response.status == 304 and cached:
+            self.cache.record("revalidated") # type: ignore
+            self.cache.refresh(url, cached[0], response.headers.get("ETag"), response.headers.get("Last-Modified")) # type: ignore
+            PERF.count("http_not_modified")
+            logger.debug("Not modified: %s", url)
+            return cached[1]
+        if response.status >= 400:
+            raise FetchError(f"HTTP {response.status} from {url}", status=response.status)
+        logger.debug("Fetched %s (%d bytes, %d on the wire)", url, len(response.data), response.tell())
+        if self.cache:
+            self.cache.record("misses")
+            self.cache.put(url, response.data, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.data
+
+    def map(self, func: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        """Apply func to each item on the engine's thread pool, returning results in order."""
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+
+class RunCache:
+    """
+    Thread-safe single-flight cache scoped to one update run.
+
+    The first caller for a key runs the loader; callers asking for the same key while
+    it is in flight, or after it finished, get the same result (or exception) instead
+    of repeating the work.
+
+    Attributes:
+        requests (int): Lookups made through the cache.
+        duplicates (int): Lookups answered by another caller's work.
+    """
+
+    def __init__(self) -> None:
+        self.requests = self.duplicates = 0
+        self._futures: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"RunCache(requests={self.requests}, duplicates={self.duplicates})"
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the value for key, running loader only if no other caller has."""
+        with self._lock:
+            self.requests += 1
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+            else:
+                self.duplicates += 1
+        if owner:
+            try:
+                future.set_result(loader()) # type: ignore
+            except Exception as e:
+                future.set_exception(e) # type: ignore
+        return future.result() # type: ignore
+
+
+_run_cache: Optional[RunCache] = None
+
+
+@contextmanager
+def run_scope() -> Iterator[RunCache]:
+    """Install a fresh RunCache for the duration of an update run and log what it saved."""
+    global _run_cache
+    previous, _run_cache = _run_cache, RunCache()
+    try:
+        yield _run_cache
+    finally:
+        logger.info("Run cache: %d requests, %d duplicates shared an earlier fetch/parse.",
+                    _run_cache.requests, _run_cache.duplicates)
+        _run_cache = previous
+
+
+def run_cached(key: Hashable, loader: Callable[[], Any]) -> Any:
+    """Return loader() through the current run's single-flight cache (called directly outside a run)."""
+    cache = _run_cache
+    return cache.get(key, loader) if cache else loader()
+
+
+# Process-wide engine, so every scraper shares the same connection pools and cache.
+ENGINE = FetchEngine(cache=HTTPCache())
+
+
+def fetch(url: str) -> bytes:
+    """Fetch a URL through the shared engine (once per run, see run_cached)."""
+    return run_cached(("page", url), lambda: ENGINE.fetch(url))
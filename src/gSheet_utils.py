@@ -7,21 +7,98 @@ Also contains helpers for accessing the JSON race schedule
 """
 
 ## IMPORTS ##
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import bisect
 import json
-from datetime import datetime
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 
 from config import *
-from tables import *
+from perf import CountingWorksheet
+
+# gspread (and the quota layer on top of it) load with the first Sheets call, so schedule
+# lookups stay cheap to import.
+if TYPE_CHECKING:
+    import gspread
 
 ## Getting & setting calculated tables on sheet ## 
 
 
+class SheetsClient:
+    """
+    Process-wide authorized gspread client.
+
+    Authorizes once, refreshes the access token shortly before it expires, and caches
+    spreadsheet and worksheet handles, so repeated reads cost one API call instead of a
+    token exchange, a metadata fetch and the read itself. Requests are rate limited and
+    retried by QuotaHTTPClient.
+
+    Attributes:
+        creds (str): Path to the service account credentials.
+    """
+
+    def __init__(self, creds: str = CREDS) -> None:
+        self.creds = creds
+        self._lock = threading.RLock()
+        self._client: Optional["gspread.Client"] = None
+        self._spreadsheets: Dict[str, "gspread.Spreadsheet"] = {}
+        self._worksheets: Dict[Tuple[str, int], "gspread.Worksheet"] = {}
+
+    def __repr__(self) -> str:
+        return f"SheetsClient(creds={self.creds!r}, spreadsheets={list(self._spreadsheets)})"
+
+    def client(self) -> "gspread.Client":
+        """Return the authorized client, refreshing its token if it is about to expire."""
+        with self._lock:
+            if self._client is None:
+                import gspread
+                from sheets_quota import QuotaHTTPClient
+                self._client = gspread.service_account(filename=self.creds, http_client=QuotaHTTPClient)
+            expiry = self._client.expiry  # naive UTC, None before the first token
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            if expiry is None or expiry - now < timedelta(seconds=TOKEN_REFRESH_MARGIN):
+                self._client.http_client.login()
+            return self._client
+
+    def spreadsheet(self, key: str) -> "gspread.Spreadsheet":
+        """Return the (cached) spreadsheet for a key."""
+        client = self.client()
+        with self._lock:
+            if key not in self._spreadsheets:
+                self._spreadsheets[key] = client.open_by_key(key)
+            return self._spreadsheets[key]
+
+    def worksheet(self, key: str, index: int) -> "gspread.Worksheet":
+        """Return the (cached) worksheet at an index of a spreadsheet, counting its API requests on PERF."""
+        spreadsheet = self.spreadsheet(key)
+        with self._lock:
+            if (key, index) not in self._worksheets:
+                self._worksheets[(key, index)] = CountingWorksheet(spreadsheet.get_worksheet(index))
+            return self._worksheets[(key, index)]
+
+    def reset(self) -> None:
+        """Drop the client and every cached handle; the next call authorizes again."""
+        with self._lock:
+            self._client = None
+            self._spreadsheets.clear()
+            self._worksheets.clear()
+
+    def use(self, client: "gspread.Client") -> None:
+        """Replace the client with an already authorized one (e.g. the offline fake in tests/)."""
+        with self._lock:
+            self.reset()
+            self._client = client
+
+
+# Process-wide client shared by the updater and the scheduler.
+CLIENT = SheetsClient()
+
+
 def get_last_calculated_raceweek() -> int:
     """Return the current raceweek from the Google Sheet (cell B2)."""
     try:
-        sh = authorize_google_sheet(CREDS, sskey)
-        predictions_sheet = sh.get_worksheet(CURRENT_SHEET)
+        predictions_sheet = CLIENT.worksheet(sskey, CURRENT_SHEET)
         raceweek = (predictions_sheet.acell("B2").numeric_value)
         return raceweek #type: ignore
     except Exception as e:
@@ -31,53 +108,169 @@ def get_last_calculated_raceweek() -> int:
         
 ## JSON Schedule functions ##
 
-def load_schedule():
-    """Load the race schedule from the JSON file."""
+@dataclass(frozen=True)
+class ScheduleIndex:
+    """
+    One parsed version of the schedule file.
+
+    Attributes:
+        races (List[dict]): Races in file order.
+        starts (List[datetime]): Start times of the timed races, sorted.
+        order (List[int]): Position in races of each entry of starts.
+        untimed (List[int]): Positions of races with no parsable time.
+        by_raceweek (Dict[int, dict]): Races keyed by raceweek.
+        by_url (Dict[str, dict]): Races keyed by results URL and qualifying URL.
+    """
+    races: List[dict]
+    starts: List[datetime]
+    order: List[int]
+    untimed: List[int]
+    by_raceweek: Dict[int, dict]
+    by_url: Dict[str, dict]
+
+
+MISSING_FILE = (-1, -1)
+
+
+class RaceSchedule:
+    """
+    The race schedule JSON, parsed once and kept in memory.
+
+    Start times are parsed to UTC datetimes up front and kept sorted, so "next race" and
+    window queries are a bisect. The file is re-read only when its mtime (or size) changes.
+
+    Attributes:
+        path (str): The schedule JSON file.
+    """
+
+    def __init__(self, path: str = JSON_FILE) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._index = ScheduleIndex([], [], [], [], {}, {})
+
+    def __repr__(self) -> str:
+        return f"RaceSchedule(path={self.path!r}, races={len(self._index.races)})"
+
+    def index(self) -> ScheduleIndex:
+        """Return the current index, reloading the file first if it changed."""
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            with self._lock:
+                # Keep the last good index, and log once until the file is back.
+                if self._stamp != MISSING_FILE:
+                    logger.error("Error loading race schedule: %s", e)
+                    self._stamp = MISSING_FILE
+                return self._index
+        with self._lock:
+            if stamp != self._stamp:
+                self._index = self._build(self._read())
+                self._stamp = stamp
+            return self._index
+
+    def _read(self) -> List[dict]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error("Error loading race schedule: %s", e)
+            return []
+
+    @staticmethod
+    def _build(races: List[dict]) -> ScheduleIndex:
+        timed = sorted((start, i) for i, race in enumerate(races) if (start := race_start(race)))
+        by_url = {}
+        for race in races:
+            if race.get("results"):
+                by_url[race["results"]] = race
+                # Same mapping as scraping_utils.qualifying_scrape_url.
+                by_url[str(race["results"])[:-11] + "qualifying"] = race
+        return ScheduleIndex(
+            races=races,
+            starts=[start for start, _ in timed],
+            order=[i for _, i in timed],
+            untimed=[i for i, race in enumerate(races) if race_start(race) is None],
+            by_raceweek={race["raceweek"]: race for race in races if "raceweek" in race},
+            by_url=by_url,
+        )
+
+    ## Queries ##
+
+    @property
+    def races(self) -> List[dict]:
+        return self.index().races
+
+    def race(self, raceweek: int) -> Optional[dict]:
+        """Return the race for a raceweek, or None."""
+        return self.index().by_raceweek.get(raceweek)
+
+    def race_for_url(self, url: str) -> Optional[dict]:
+        """Return the race whose results or qualifying page is url, or None."""
+        return self.index().by_url.get(url)
+
+    def next_race(self, now: Optional[datetime] = None) -> Optional[dict]:
+        """Return the first race starting after now, or None."""
+        index = self.index()
+        i = bisect.bisect_right(index.starts, now or datetime.now(timezone.utc))
+        return index.races[index.order[i]] if i < len(index.starts) else None
+
+    def between(self, start: datetime, end: datetime) -> List[dict]:
+        """Return the races starting in [start, end), in time order."""
+        index = self.index()
+        lo, hi = bisect.bisect_left(index.starts, start), bisect.bisect_left(index.starts, end)
+        return [index.races[i] for i in index.order[lo:hi]]
+
+    def started(self, now: Optional[datetime] = None) -> List[dict]:
+        """Return the races that have started, in file order (races with no parsable time are kept)."""
+        index = self.index()
+        k = bisect.bisect_right(index.starts, now or datetime.now(timezone.utc))
+        return [index.races[i] for i in sorted(index.order[:k] + index.untimed)]
+
+
+def race_start(race: dict) -> Optional[datetime]:
+    """Return a race's start time as a UTC datetime, or None if it is missing/unparsable."""
     try:
-        with open(JSON_FILE, "r") as f:
-            schedule = json.load(f)
-        return schedule
-    except Exception as e:
-        logger.error("Error loading race schedule: %s", e)
-        return []
-    
-def get_race(raceweek: int) -> dict:
+        time = datetime.fromisoformat(race["time"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return time if time.tzinfo else time.replace(tzinfo=timezone.utc)
+
+
+# Process-wide schedule shared by the updater and the scheduler.
+SCHEDULE = RaceSchedule()
+
+
+def load_schedule() -> List[dict]:
+    """Return the race schedule (re-read only when the JSON file changes)."""
+    return SCHEDULE.races
+
+
+def get_race(raceweek: int) -> Optional[dict]:
     """ Returns a race by the raceweek provided"""
-    schedule = load_schedule()
-    return schedule[raceweek]
+    return SCHEDULE.race(raceweek)
     
 
 def get_next_race_to_calculate(raceweek: int) -> Optional[dict]:
     """
-    Load the race schedule JSON and return the argument raceweek + 1.
+    Return the race of the argument raceweek + 1.
     """
-    races = load_schedule()
-    upcoming = [race for race in races if race.get("raceweek", 0) == raceweek + 1]
-    if not upcoming:
+    race = SCHEDULE.race(raceweek + 1)
+    if not race:
         logger.info("No upcoming race found for raceweek %d.", raceweek + 1)
         return None
-    return upcoming[0]
+    return race
 
 def get_next_race() -> Optional[dict]:
     """
-    Load the race schedule JSON and return the next race by checking the first returned future time.
+    Return the next race to start.
     """
-    schedule = load_schedule()
-
-    for i in range(TOT_RACES+1):
-        now = datetime.now()
-        race=schedule[i]
-        try:
-            time = datetime.fromisoformat(race["time"])
-            if now < time:
-                return race
-            else: pass
-        except Exception as e:
-            logger.warning(f"Error parsing {race['name']}'s date-time. {e}")
-            continue
-        else:
-            logger.warning("No next race in schedule")
-            return {}
+    race = SCHEDULE.next_race()
+    if not race:
+        logger.warning("No next race in schedule")
+        return {}
+    return race
         
 
 def check_missed_races(last_raceweek: int) -> Optional[int]:
@@ -95,20 +288,33 @@ def get_missed_races(last_raceweek: int, races_missed: int) -> List[dict]:
     """
     Returns all ready to update races, that may have been skipped.
     """
-    schedule = load_schedule()
-    races_to_update = []    
-    for i in range(last_raceweek, races_missed + last_raceweek):
-        races_to_update.append(schedule[i])
-    return races_to_update
+    races = (SCHEDULE.race(raceweek) for raceweek in range(last_raceweek + 1, last_raceweek + races_missed + 1))
+    return [race for race in races if race]
 
 
-def get_race_result_urls(year: int) -> Optional[List[str]]:
+def get_race_result_urls(year: int, started_only: bool = False) -> Optional[List[str]]:
     """
-    Load the race schedule JSON and return a list of the race URLs.
+    Return a list of the race URLs from the schedule.
+    With started_only, races scheduled in the future are left out (races with no parsable time are kept).
     """
-    races = load_schedule()    
+    races = get_started_races() if started_only else load_schedule()
     return [race["results"] for race in races]
 
+
+def get_started_races() -> List[dict]:
+    """Return the races that have started (races with no parsable time are kept)."""
+    return SCHEDULE.started()
+
+
+def results_final_after(url: str) -> Optional[datetime]:
+    """
+    Return the time after which a race's results or qualifying page is final
+    (race start + RESULTS_FINAL_HOURS), or None for pages not in the schedule.
+    """
+    race = SCHEDULE.race_for_url(url)
+    time = race_start(race) if race else None
+    return time + timedelta(hours=RESULTS_FINAL_HOURS) if time else None
+
 ## 
 
 def log_update(sheet) -> None:
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Per-run performance report.
+
+The updater, scrapers, sheet helpers and scheduler record stage wall times, Sheets
+API requests, HTTP traffic and page parse times on the process-wide PERF. At the end
+of each update run the figures are appended to a JSON-lines log and written as a
+Prometheus textfile, then reset. A report covers everything since the previous one,
+so the scheduler's results probes between runs show up in the next run's report.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+from config import *
+
+# Worksheet methods that are one Sheets API request each.
+SHEETS_READS = {"batch_get", "get", "get_values", "get_all_values", "get_all_records", "cell", "acell"}
+SHEETS_WRITES = {"batch_update", "update", "update_cell", "update_acell", "update_cells", "resize", "batch_clear"}
+
+
+class PerfReport:
+    """
+    Thread-safe timings and counters for one reporting period.
+
+    Attributes:
+        started (float): Start of the period (epoch seconds).
+        stages (Dict[str, List[float]]): [total seconds, calls] per stage.
+        counters (Dict[str, float]): Named counts, e.g. "sheets_reads" or "http_bytes".
+        pages (Dict[str, float]): Parse seconds per page URL.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __repr__(self) -> str:
+        return f"PerfReport(stages={len(self.stages)}, counters={self.counters})"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            self.stages: Dict[str, List[float]] = {}
+            self.counters: Dict[str, float] = {}
+            self.pages: Dict[str, float] = {}
+
+    ## Recording
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            total = self.stages.setdefault(stage, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the body of a with-block as one call of a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def page(self, url: str, seconds: float) -> None:
+        """Record the parse time of one page."""
+        with self._lock:
+            self.pages[url] = self.pages.get(url, 0.0) + seconds
+
+    ## Reporting
+
+    def summary(self, run: str = "update") -> Dict[str, Any]:
+        """Return the period's figures as a JSON-serialisable dict."""
+        with self._lock:
+            counters, pages = dict(self.counters), dict(self.pages)
+            stages = {name: {"seconds": round(s, 4), "calls": int(n)} for name, (s, n) in self.stages.items()}
+            started = self.started
+        hits, requests = counters.get("http_cache_hits", 0), counters.get("http_requests", 0)
+        served = hits + counters.get("http_not_modified", 0)
+        return {
+            "run": run,
+            "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "period_seconds": round(time.time() - started, 3),
+            "wall_seconds": stages.get(run, {}).get("seconds", 0.0),
+            "stages": stages,
+            "sheets": {"reads": int(counters.get("sheets_reads", 0)),
+                       "writes": int(counters.get("sheets_writes", 0)),
+                       "retries": int(counters.get("sheets_retries", 0)),
+                       "wait_seconds": round(counters.get("sheets_wait_seconds", 0.0), 3)},
+            "http": {"requests": int(requests), "bytes": int(counters.get("http_bytes", 0)),
+                     "cache_hits": int(hits), "not_modified": int(counters.get("http_not_modified", 0)),
+                     "cache_hit_rate": round(served / (hits + requests), 3) if hits + requests else 0.0},
+            "parse": {"pages": len(pages), "stored": int(counters.get("table_store_hits", 0)),
+                      "seconds": round(sum(pages.values()), 4),
+                      "max_seconds": round(max(pages.values(), default=0.0), 4),
+                      "per_page": {url: round(s, 4) for url, s in pages.items()}},
+        }
+
+    def write(self, run: str = "update", log: str = PERF_LOG, textfile: str = PERF_TEXTFILE) -> Dict[str, Any]:
+        """Append the period's summary to the JSON-lines log, rewrite the Prometheus textfile, and reset."""
+        summary = self.summary(run)
+        try:
+            os.makedirs(os.path.dirname(log), exist_ok=True)
+            with open(log, "a") as f:
+                f.write(json.dumps(summary) + "\n")
+            if textfile:
+                os.makedirs(os.path.dirname(textfile), exist_ok=True)
+                tmp = f"{textfile}.tmp"
+                with open(tmp, "w") as f:
+                    f.write(prometheus_text(summary))
+                os.replace(tmp, textfile)
+        except OSError as e:
+            logger.warning("Unable to write performance report: %s", e)
+        logger.info("Run report: %.2fs, Sheets %d reads/%d writes, HTTP %d requests (%d bytes, %.0f%% cached), %d pages parsed in %.2fs, %d tables loaded from the store",
+                    summary["wall_seconds"], summary["sheets"]["reads"], summary["sheets"]["writes"],
+                    summary["http"]["requests"], summary["http"]["bytes"], summary["http"]["cache_hit_rate"] * 100,
+                    summary["parse"]["pages"], summary["parse"]["seconds"], summary["parse"]["stored"])
+        self.reset()
+        return summary
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric(name: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]) -> str:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines)
+
+
+def prometheus_text(summary: Dict[str, Any]) -> str:
+    """Render a run summary in the Prometheus text exposition format (for node_exporter's textfile collector)."""
+    run = {"run": summary["run"]}
+    finished = datetime.fromisoformat(summary["finished"]).timestamp()
+    metrics = [
+        _metric("f1_predictions_last_run_timestamp_seconds", "When the last run finished.", [(run, finished)]),
+        _metric("f1_predictions_run_seconds", "Wall time of the last run.", [(run, summary["wall_seconds"])]),
+        _metric("f1_predictions_stage_seconds", "Total wall time per stage in the last run.",
+                [({"stage": name}, stage["seconds"]) for name, stage in summary["stages"].items()]),
+        _metric("f1_predictions_stage_calls", "Times each stage ran in the last run.",
+                [({"stage": name}, stage["calls"]) for name, stage in summary["stages"].items()]),
+        _metric("f1_predictions_sheets_requests", "Sheets API requests in the last run.",
+                [({"kind": "read"}, summary["sheets"]["reads"]), ({"kind": "write"}, summary["sheets"]["writes"])]),
+        _metric("f1_predictions_sheets_retries", "Sheets requests retried after throttling or errors in the last run.",
+                [({}, summary["sheets"]["retries"])]),
+        _metric("f1_predictions_sheets_wait_seconds", "Time spent waiting on the Sheets rate limiter in the last run.",
+                [({}, summary["sheets"]["wait_seconds"])]),
+        _metric("f1_predictions_http_requests", "HTTP requests sent in the last run.", [({}, summary["http"]["requests"])]),
+        _metric("f1_predictions_http_bytes", "HTTP response body bytes received on the wire (before decompression) in the last run.", [({}, summary["http"]["bytes"])]),
+        _metric("f1_predictions_http_cache_hit_ratio", "Share of pages served from the HTTP cache in the last run.",
+                [({}, summary["http"]["cache_hit_rate"])]),
+        _metric("f1_predictions_parse_pages", "Pages parsed in the last run.", [({}, summary["parse"]["pages"])]),
+        _metric("f1_predictions_parse_stored", "Tables loaded from the table store instead of parsed in the last run.",
+                [({}, summary["parse"]["stored"])]),
+        _metric("f1_predictions_parse_seconds", "Page parse time in the last run.",
+                [({"stat": "sum"}, summary["parse"]["seconds"]), ({"stat": "max"}, summary["parse"]["max_seconds"])]),
+    ]
+    return "\n".join(metrics) + "\n"
+
+
+# Process-wide report shared by every module.
+PERF = PerfReport()
+
+
+class CountingWorksheet:
+    """
+    Wraps a gspread worksheet, counting each call that is a Sheets API request on PERF.
+
+    Every other attribute is passed through to the wrapped worksheet.
+    """
+
+    def __init__(self, worksheet) -> None:
+        self._worksheet = worksheet
+
+    def __repr__(self) -> str:
+        return f"CountingWorksheet({self._worksheet!r})"
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._worksheet, name)
+        kind = "sheets_reads" if name in SHEETS_READS else "sheets_writes" if name in SHEETS_WRITES else None
+        if kind is None or not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            PERF.count(kind)
+            return attr(*args, **kwargs)
+        return counted
+
+
+@contextmanager
+def perf_run(run: str = "update") -> Iterator[PerfReport]:
+    """Time a run as a stage, then write and reset the report when it ends."""
+    try:
+        with PERF.stage(run):
+            yield PERF
+    finally:
+        PERF.write(run)
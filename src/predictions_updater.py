@@ -8,48 +8,46 @@ data from the Formula 1 website using gspread and pandas.
 
 ## IMPORTS ##
 import time
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 import pandas as pd
 import numpy as np
-import threading as td
 
 
 from config import *
 from tables import *
-from scraping_utils import scrape_f1_website
-from gSheet_utils import log_update
+from fetch_utils import ENGINE, run_scope
+from scraping_utils import (scrape_f1_website, scrape_table_from_url, scrape_sprint_points, qualifying_scrape_url,
+                            grand_prix_key, race_keys, extract_dnf_counts, extract_podium_counts, extract_pole_counts, extract_points,
+                            extract_finishes, standings_points)
+from gSheet_utils import CLIENT, log_update, get_started_races, get_missed_races
+from wildcards import CHECKPOINT
+from task_graph import TaskGraph
+from scoring import prediction_scores, wildcard_ranks, player_totals, player_columns, weekly_totals, finish_counts
+from registry import REGISTRY
+from perf import PERF, perf_run
+from sheets_quota import SHEETS_ERRORS
 
 ## Score calculations ##
 
 # Helpers #
 def initialise_driver_wildcards() -> dict:
-    return {d: 0 for d in list(NAME_CONVERSION.values())[:TOT_DRIVERS]}
+    return dict.fromkeys(REGISTRY.drivers, 0)
 
 def inistialise_team_wildcards() -> dict:
-    return {t: 0 for t in list(NAME_CONVERSION.values())[:-TOT_TEAMS]}
+    return dict.fromkeys(REGISTRY.teams, 0)
+
+def wildcard_table(counts: np.ndarray, column: str) -> pd.DataFrame:
+    """Build a ranked wildcard table from per-driver counts (an array indexed by registry ID)."""
+    df = pd.DataFrame({column: counts[REGISTRY.driver_ids]}, index=REGISTRY.drivers)
+    df.sort_values(column, ascending=False, inplace=True)
+    df["Rank"] = df[column].rank(method="dense", ascending=False) - 1
+    return df
 
 # Score calcs #
-def calulate_prediction_scores(scoreboard: pd.DataFrame, driver_standings: dict, team_standings: dict) -> pd.DataFrame:
-    
-    score_cols = [i * 2 + 1 for i in range(len(PLAYERS))]
+def calulate_prediction_scores(scoreboard: pd.DataFrame, driver_positions: np.ndarray, team_positions: np.ndarray) -> pd.DataFrame:
     try:
-        # Precompute the row indices as a NumPy array.
-        indices = np.arange(len(scoreboard))
-        for player, col in zip(PLAYERS, score_cols):
-            # Map player names to positions (for drivers and teams)
-            driver_map = scoreboard[player].map(driver_standings)
-            team_map = scoreboard[player].map(team_standings)
-            # Provide a fallback using the row index if mapping returns NaN.
-            driver_map = driver_map.fillna(pd.Series(indices, index=scoreboard.index))
-            team_map = team_map.fillna(pd.Series(indices - PREDICTION_DRIVERS, index=scoreboard.index))
-            # Compute the scores using np.where for vectorized condition handling.
-            scores = np.where(
-                indices < PREDICTION_DRIVERS,
-                np.abs(indices - driver_map),
-                np.abs((indices - PREDICTION_DRIVERS) - team_map)
-            )
-            scoreboard.iloc[:, col] = scores  # or use .loc if you have column names
-
+        scoreboard = prediction_scores(scoreboard, driver_positions, team_positions)
     except Exception as e:
         logger.info("Error calculating new prediction scores, scores unchanged: %s", e)
     return scoreboard
@@ -68,204 +66,411 @@ def update_wildcard_row(wc_df: pd.DataFrame, row: int, updated: pd.DataFrame, sr
     if "Rank" not in updated.columns:
         logger.warning("Source %s missing 'Rank'; skipping row %s.", src, row)
         return wc_df
-    for i, player in enumerate(PLAYERS):
-        pred = wc_df.iat[row, i * 2 + 1]
-        rank = updated["Rank"].get(pred, None)
-        if rank is None:
-            logger.warning("No rank for '%s' from %s at row %s.", pred, src, row)
-        wc_df.iat[row, i * 2 + 2] = rank
+    wc_df, unranked = wildcard_ranks(wc_df, row, updated["Rank"])
+    if unranked:
+        logger.warning("No rank for %s from %s at row %s.", unranked, src, row)
     return wc_df
 
 
 ### Updating the Sheet ###
 
-def update_standings(sheet, site: str, drop_cols: List[str], standings: TableCoords) -> None:
-    """Generic update for standings."""
+def scrape_standings(site: str, drop_cols: List[str]) -> pd.DataFrame:
+    """Scrape a standings table (drivers or team), returning an empty DataFrame on failure."""
     try:
         df = scrape_f1_website(YEAR, site=site, drop_cols=drop_cols)
-
         if not isinstance(df, pd.DataFrame) or df.empty:
             logger.warning(f"{site} data empty; skipping update.")
-            return
+            return pd.DataFrame()
+        return df
+    except Exception as e:
+        logger.error(f"Error scraping {site} standings: {e}")
+        return pd.DataFrame()
+
 
+def update_standings(sheet, df: pd.DataFrame, standings: TableCoords) -> None:
+    """Generic update for standings."""
+    if not df.empty:
         standings.set_table(sheet=sheet, updated_table=df)
-    except Exception as e:
-        logger.error(f"Error updating {site} standings: {e}")
 
 
-def update_prediction_points(sheet) -> None:
-    """Update the prediction scoreboard by comparing user predictions against standings."""
+def update_prediction_points(sheet, layout: SheetLayout = LAYOUT) -> Optional[pd.DataFrame]:
+    """
+    Update the prediction scoreboard by comparing user predictions against standings.
+
+    Args:
+        sheet: The worksheet or SheetSnapshot to update.
+        layout (SheetLayout): Where the sheet's scoreboard and standings are.
+
+    Returns:
+        Optional[pd.DataFrame]: The scored scoreboard, or None if it could not be scored.
+    """
     try:
-        updated_scoreboard = calulate_prediction_scores(scoreboard=SCOREBOARD.get_table(sheet),
-                                                        driver_standings=WDC.get_dict(sheet),
-                                                        team_standings=WCC.get_dict(sheet))
-        SCOREBOARD.set_table(sheet=sheet, updated_table=updated_scoreboard)
+        updated_scoreboard = calulate_prediction_scores(scoreboard=layout.scoreboard.get_table(sheet),
+                                                        driver_positions=layout.wdc.get_positions(sheet),
+                                                        team_positions=layout.wcc.get_positions(sheet))
+        layout.scoreboard.set_table(sheet=sheet, updated_table=updated_scoreboard)
+        return updated_scoreboard
+    except SHEETS_ERRORS:
+        raise
     except Exception as e:
         logger.error("Error updating prediction points: %s", e)
+        return None
 
 
-def update_fastest_laps_scores(sheet) -> Tuple[int, pd.DataFrame]:
+def calculate_fastest_laps() -> Tuple[int, pd.DataFrame]:
     """Process fastest laps data and return its wildcard row update."""
     logger.info("Updating Fastest laps...")
-    counts = initialise_driver_wildcards()
-    df = scrape_f1_website(YEAR, site="fastest-laps", drop_cols=FLS.drop_cols)
-    if not isinstance(df, pd.DataFrame) or df.empty:
-        logger.warning("Fastest laps data unavailable.")
-        return FLS.wildcard_index, pd.DataFrame() #type: ignore Constant ensures type safe
-    
-    for name in df["Driver"]:
-        key = NAME_CONVERSION.get(str(name[-3:]))
-        if key:
-            counts[key] += 1
-            
-    #below only required during initialisation.
-    fl_df = pd.DataFrame.from_dict(counts, orient="index", columns=["FL Count"])
-    
-    #still required
-    fl_df.sort_values("FL Count", ascending=False, inplace=True)
-    #recalculation below would still be  required - may need to rethink once it is incremental
-    fl_df["Rank"] = fl_df["FL Count"].rank(method="dense", ascending=False) - 1
-
-    #sets table back onto sheet, then also sends it to 
-    FLS.set_table(sheet=sheet, updated_table=fl_df, WC=True)
-    logger.info("Fastest laps updated.")
+    races = get_started_races()
+    if CHECKPOINT.pending(races, "fastest_lap"):
+        df = scrape_f1_website(YEAR, site="fastest-laps", drop_cols=FLS.drop_cols)
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            logger.warning("Fastest laps data unavailable.")
+            return FLS.wildcard_index, pd.DataFrame() #type: ignore Constant ensures type safe
+
+        # Rows are matched to races by name: a cancelled round, or one with no timed lap, has no row.
+        by_key = {key: race for race in races for key in race_keys(race)}
+        laps: Dict[int, str] = {}
+        for grand_prix, name in zip(df["Grand Prix"], df["Driver"]):
+            race = by_key.get(grand_prix_key(grand_prix))
+            if race is None:
+                logger.warning("Fastest lap for %s matches no started race; skipped.", grand_prix)
+                continue
+            laps[race["raceweek"]] = name
+        # A round without a row is complete (with no fastest lap) once a later round has one.
+        last = max(laps, default=0)
+        for race in CHECKPOINT.pending(races, "fastest_lap"):
+            if race["raceweek"] in laps:
+                CHECKPOINT.record(race, fastest_lap=REGISTRY.count([laps[race["raceweek"]]]))
+            elif race["raceweek"] < last:
+                logger.info("No fastest lap listed for %s.", race["name"])
+                CHECKPOINT.record(race, fastest_lap=REGISTRY.count([]))
+        CHECKPOINT.save()
+
+    fl_df = wildcard_table(CHECKPOINT.totals(races, "fastest_lap"), "FL Count")
+    logger.info("Fastest laps calculated.")
     return FLS.wildcard_index, fl_df #type: ignore Constant ensures type safe
 
 
-def update_DNFs_and_podiums_scores(sheet) -> List[Tuple[int, pd.DataFrame]]:
+def calculate_DNFs_and_podiums() -> List[Tuple[int, pd.DataFrame]]:
     """Process DNFs and podium data and return their wildcard row updates."""
     logger.info("Updating Podiums and DNFs...")
-    dnf_counts = {d: 0 for d in list(NAME_CONVERSION.values())[:TOT_DRIVERS]}
-    podium_counts = {d: 0 for d in list(NAME_CONVERSION.values())[:TOT_DRIVERS]}
-    for link in scrape_f1_website(YEAR, all_race_URLs=True) or []:
+    races = get_started_races()
+    # Championship points and finishing positions come off the same pages, plus the sprint's points
+    # where there was one; the tracker backfill rebuilds past standings (ties by countback) from them.
+    pending = CHECKPOINT.pending(races, "dnfs", "podiums", "points", "sprint_points", "finish", "second_finish")
+    # Fetch only the rounds missing from the checkpoint, and sprint pages only for sprint weekends
+    # (see scrape_sprint_points), all in parallel; then fold them in race order.
+    jobs = [(scrape_table_from_url, race["results"]) for race in pending] + [(scrape_sprint_points, race) for race in pending]
+    scraped = ENGINE.map(lambda job: job[0](job[1]), jobs)
+    for race, df, sprint_points in zip(pending, scraped[:len(pending)], scraped[len(pending):]): #type: ignore
         try:
-            df = scrape_f1_website(YEAR, link=link, drop_cols=PODIUMS.drop_cols) #type:ignore
             if not isinstance(df, pd.DataFrame) or df.empty:
                 break
-
-            for name in df.drop(df[df['Time/retired'] != "DNF"].index)["Driver"]:
-                key = NAME_CONVERSION.get(str(name[-3:]))
-                if key:
-                    dnf_counts[key] += 1
-                    
-        
-            for name in df[df["Pos"].isin(["1", "2", "3"])]["Driver"]:
-                key = NAME_CONVERSION.get(str(name[-3:]))
-                if key:
-                    podium_counts[key] += 1
-                    
+            if sprint_points is None:
+                logger.warning("Sprint results for %s unavailable; round left for a later run.", race["name"])
+                break
+            finish, second_finish = extract_finishes(df)
+            CHECKPOINT.record(race, dnfs=extract_dnf_counts(df), podiums=extract_podium_counts(df),
+                              points=extract_points(df), sprint_points=sprint_points,
+                              finish=finish, second_finish=second_finish)
         except Exception as e:
-            logger.error("Error on link %s: %s", link, e)
+            logger.error("Error on link %s: %s", race["results"], e)
             break
-    dnf_df = pd.DataFrame.from_dict(dnf_counts, orient="index", columns=["DNF Count"])
-    dnf_df.sort_values("DNF Count", ascending=False, inplace=True)
-    dnf_df["Rank"] = dnf_df["DNF Count"].rank(method="dense", ascending=False) - 1
-    DNFS.set_table(sheet,dnf_df,WC=True)
-    podium_df = pd.DataFrame.from_dict(podium_counts, orient="index", columns=["Podium Count"])
-    podium_df.sort_values("Podium Count", ascending=False, inplace=True)
-    podium_df["Rank"] = podium_df["Podium Count"].rank(method="dense", ascending=False) - 1
-    PODIUMS.set_table(sheet,podium_df,WC=True)
-    logger.info("Podiums & DNFs updated.")
+    CHECKPOINT.save()
+    logger.info("Scraped %d of %d rounds for Podiums & DNFs.", len(pending), len(races))
+
+    dnf_df = wildcard_table(CHECKPOINT.totals(races, "dnfs"), "DNF Count")
+    podium_df = wildcard_table(CHECKPOINT.totals(races, "podiums"), "Podium Count")
+    logger.info("Podiums & DNFs calculated.")
     return [(DNFS.wildcard_index, dnf_df), (PODIUMS.wildcard_index, podium_df)] #type: ignore Constant ensures type safe
 
 
 
-def update_pole_positions_scores(sheet) -> Tuple[int, pd.DataFrame]:
+def calculate_pole_positions() -> Tuple[int, pd.DataFrame]:
     """Process pole positions data and return its wildcard row update."""
     logger.info("Updating Poles...")
-    pole_counts = {d: 0 for d in list(NAME_CONVERSION.values())[:TOT_DRIVERS]}
-    for link in scrape_f1_website(YEAR, all_race_URLs=True) or []:
+    races = get_started_races()
+    pending = CHECKPOINT.pending(races, "pole")
+    q_links = [qualifying_scrape_url(race["results"]) for race in pending]
+    # Fetch only the rounds missing from the checkpoint, in parallel, then fold them in race order.
+    for race, df in zip(pending, scrape_f1_website(YEAR, links=q_links)): #type: ignore
         try:
-            q_link = link[:-11] + "qualifying" #type: ignore
-            df = scrape_f1_website(YEAR, link=q_link,drop_cols=POLES.drop_cols)
-            
             if not isinstance(df, pd.DataFrame) or df.empty:
                 break
-
-            for name in df.iloc[:1]["Driver"]:
-                key = NAME_CONVERSION.get(str(name[-3:]))
-                if key:
-                    pole_counts[key] += 1
+            CHECKPOINT.record(race, pole=extract_pole_counts(df))
         except Exception as e:
-            logger.error("Error on link %s: %s", link, e)
+            logger.error("Error on link %s: %s", race["results"], e)
             break
-    pole_df = pd.DataFrame.from_dict(pole_counts, orient="index", columns=["Pole Count"])
-    pole_df.sort_values("Pole Count", ascending=False, inplace=True)
-    pole_df["Rank"] = pole_df["Pole Count"].rank(method="dense", ascending=False) - 1
-    POLES.set_table(sheet, pole_df, WC=True)
-    logger.info("Poles updated.")
+    CHECKPOINT.save()
+    logger.info("Scraped %d of %d rounds for Poles.", len(pending), len(races))
+
+    pole_df = wildcard_table(CHECKPOINT.totals(races, "pole"), "Pole Count")
+    logger.info("Poles calculated.")
     return POLES.wildcard_index, pole_df ##type: ignore Constant ensures type safe
 
 
-def update_wildcard_scores(sheet) -> None:
-    """Launch wildcard updates in parallel and apply the rank updates."""
+def update_wildcard_scores(sheet, updates: List[Tuple[int, pd.DataFrame]], layout: SheetLayout = LAYOUT) -> pd.DataFrame:
+    """Place the wildcard tables on the sheet and apply their rank updates, returning the ranked wildcard points table."""
     logger.info("Updating WildCards")
-    wc_df = WILDCARD_POINTS.get_table(sheet)
-    updates: List[Tuple[int, pd.DataFrame]] = []
-    threads = []
-
-    def run_and_collect(func, args):
-        res = func(*args)
-        if res:
-            updates.append(res)
-
-    threads.append(td.Thread(target=run_and_collect, args=(update_fastest_laps_scores, (sheet,))))
-    threads.append(td.Thread(target=lambda: updates.extend(update_DNFs_and_podiums_scores(sheet,))))
-    threads.append(td.Thread(target=run_and_collect, args=(update_pole_positions_scores, (sheet,))))
-    for t in threads:
-        t.start()
-    for t in threads:
-        t.join()
-
+    wc_df = layout.wildcard_points.get_table(sheet)
     for row_index, upd_df in updates:
+        if not upd_df.empty:
+            WILDCARD_TABLES[row_index].set_table(sheet, upd_df, WC=True)
         wc_df = update_wildcard_row(wc_df, row_index, upd_df, src="Wildcard Update")
-    WILDCARD_POINTS.set_table(sheet=sheet, updated_table=wc_df)
+    layout.wildcard_points.set_table(sheet=sheet, updated_table=wc_df)
     logger.info("Wildcards updated.")
+    return wc_df
+
+def wildcard_updates(fastest_laps: Optional[Tuple[int, pd.DataFrame]],
+                     dnfs_podiums: Optional[List[Tuple[int, pd.DataFrame]]],
+                     poles: Optional[Tuple[int, pd.DataFrame]]) -> List[Tuple[int, pd.DataFrame]]:
+    """Collect the wildcard row updates the season tasks produced, leaving out failed tasks (None) and empty tables."""
+    updates = [fastest_laps, *(dnfs_podiums or []), poles]
+    return [update for update in updates if update is not None and not update[1].empty]
+
+
+def calculate_totals(scoreboard: Optional[pd.DataFrame], wildcards: pd.DataFrame,
+                     updates: List[Tuple[int, pd.DataFrame]]) -> Optional[pd.Series]:
+    """
+    Each player's points total from this run's scored tables, or None if they could not be totalled.
+
+    A wildcard row left as it was (its scrape failed) would total the week wrongly, so there are no totals
+    then; a later run backfills the tracker row once the row can be rebuilt.
+    """
+    if scoreboard is None:
+        return None
+    missing = sorted(set(WILDCARD_TABLES) - {row for row, _ in updates})
+    if missing:
+        logger.warning("Wildcard rows %s not updated; points tracker left for a later run.", missing)
+        return None
+    try:
+        return player_totals(scoreboard, wildcards)
+    except Exception as e:
+        logger.error("Error calculating player totals: %s", e)
+        return None
 
 #TODO Move to OOP?
-def update_points_tracker(sheet, current_raceweek: int) -> None:
-    if current_raceweek:
-        for i, cell in enumerate(PLAYERS_POINTS):
+def update_points_tracker(sheet, current_raceweek: int, totals: Optional[pd.Series]) -> None:
+    """Queue this raceweek's row of the points tracker from the totals computed in this run."""
+    if current_raceweek and totals is not None:
+        for i, new_val in enumerate(totals):
             target = POINTS_TRACKER.offset_cell(row_offset=current_raceweek, col_offset=i)
-            new_val = int(sheet.cell(cell.row, cell.column).value)
-            sheet.update_cell(*target.to_tuple(), new_val)
+            sheet.update_cell(*target.to_tuple(), int(new_val))
         logger.info(f"Raceweek {current_raceweek} score tracker updated.")
     else: logger.info("Unable to update points tracker for raceweek %s", current_raceweek)
 
 
-def calculate_raceweek_points(sh, sheet: int) -> None:
+def tracker_row_missing(sheet, raceweek: int, players: int) -> bool:
+    """Return True if any player's points tracker cell for a raceweek is blank."""
+    return any(sheet.cell(*POINTS_TRACKER.offset_cell(row_offset=raceweek, col_offset=i).to_tuple()).value == ""
+               for i in range(players))
+
+
+def backfill_tracker(sheet, current_raceweek: int, scoreboard: Optional[pd.DataFrame], wildcards: pd.DataFrame,
+                     wdc: pd.DataFrame, wcc: pd.DataFrame) -> List[int]:
+    """
+    Fill the points tracker rows of earlier raceweeks that no run wrote (e.g. the scheduler
+    was down over a weekend), rebuilding each week's standings (ties broken by countback) and
+    wildcard counts from the checkpointed per-race results. All missing weeks are totalled in one pass and queued
+    with the run's other writes.
+
+    Only exact rows are written. Nothing is backfilled unless the checkpointed race and sprint
+    points add up to the scraped standings (a penalty or a missed sprint would shift every
+    later week), or if a scored wildcard row has no per-race counts to rebuild it from.
+
+    Returns:
+        List[int]: The raceweeks backfilled.
+    """
+    if not current_raceweek or scoreboard is None:
+        return []
+    try:
+        races = get_missed_races(0, current_raceweek - 1)
+        players = len(player_columns(scoreboard)[0])
+        missing = [i for i, race in enumerate(races) if tracker_row_missing(sheet, race["raceweek"], players)]
+        if not missing:
+            return []
+        if wdc.empty or wcc.empty:
+            logger.warning("No standings to check the checkpoint against; raceweeks not backfilled.")
+            return []
+        season = get_started_races()
+        if not all(CHECKPOINT.recorded(race, field) for race in season for field in ("points", "sprint_points")):
+            logger.info("Season results not all checkpointed yet; raceweeks not backfilled.")
+            return []
+        rebuilt = CHECKPOINT.totals(season, "points") + CHECKPOINT.totals(season, "sprint_points")
+        if not np.array_equal(rebuilt, standings_points(wdc, wcc)):
+            logger.warning("Checkpointed results do not add up to the current standings; raceweeks %s not backfilled.",
+                           [races[i]["raceweek"] for i in missing])
+            return []
+
+        # A week can only be rebuilt if every race up to it has all its results checkpointed.
+        fields = {"points": None, "sprint_points": None, "finish": None, "second_finish": None,
+                  "pole": POLES, "fastest_lap": FLS, "podiums": PODIUMS, "dnfs": DNFS}
+        complete = np.cumprod([all(CHECKPOINT.recorded(race, field) for field in fields) for race in races]).astype(bool)
+        weeks = [i for i in missing if complete[i]]
+        if len(weeks) < len(missing):
+            logger.warning("No checkpointed results to backfill raceweeks %s.",
+                           [races[i]["raceweek"] for i in missing if not complete[i]])
+        if not weeks:
+            return []
+
+        cumulative = {field: np.cumsum(CHECKPOINT.matrix(races, field), axis=0)[weeks] for field in fields}
+        finishes = np.cumsum(finish_counts(CHECKPOINT.matrix(races, "finish"), CHECKPOINT.matrix(races, "second_finish")),
+                             axis=0)[weeks]
+        totals = weekly_totals(scoreboard, wildcards, points=cumulative["points"] + cumulative["sprint_points"],
+                               counts={coords.wildcard_index: cumulative[field] #type: ignore Constant ensures type safe
+                                       for field, coords in fields.items() if coords}, finishes=finishes)
+    except SHEETS_ERRORS:
+        raise
+    except Exception as e:
+        logger.error("Error backfilling points tracker: %s", e)
+        return []
+
+    for i, row in zip(weeks, totals):
+        for col, new_val in enumerate(row):
+            target = POINTS_TRACKER.offset_cell(row_offset=races[i]["raceweek"], col_offset=col)
+            sheet.update_cell(*target.to_tuple(), int(new_val))
+    backfilled = [races[i]["raceweek"] for i in weeks]
+    logger.info("Backfilled score tracker for raceweeks %s.", backfilled)
+    return backfilled
+
+
+def log_changes(sheet) -> None:
+    """Stamp the run log cells, unless the run left the sheet unchanged."""
+    if sheet.changed:
+        log_update(sheet)
+    else:
+        logger.info("Sheet unchanged; run log cells left as they are.")
+
+
+## Update task graph ##
+
+def add_season_tasks(graph: TaskGraph) -> None:
+    """Scrape and compute tasks: season data that does not depend on any sheet."""
+    graph.add("wdc", lambda: scrape_standings("drivers", WDC.drop_cols)) #type: ignore
+    graph.add("wcc", lambda: scrape_standings("team", WCC.drop_cols)) #type: ignore
+    graph.add("fastest_laps", calculate_fastest_laps)
+    graph.add("dnfs_podiums", calculate_DNFs_and_podiums)
+    graph.add("poles", calculate_pole_positions)
+
+
+def add_sheet_tasks(graph: TaskGraph) -> None:
+    """Read and write tasks for one worksheet, fed by the season tasks."""
+    graph.add("sheet", lambda worksheet: SheetSnapshot(worksheet, tables=[], cells=[SNAPSHOT_ROWS]),
+              deps=["worksheet"])
+    # Player-dependent ranges are sized from the sheet's own header, not from PLAYERS.
+    graph.add("layout", lambda sheet: read_layout(sheet), deps=["sheet"])
+    graph.add("write_wdc", lambda sheet, layout, wdc: update_standings(sheet, wdc, layout.wdc),
+              deps=["sheet", "layout", "wdc"])
+    graph.add("write_wcc", lambda sheet, layout, wcc: update_standings(sheet, wcc, layout.wcc),
+              deps=["sheet", "layout", "wcc"])
+    # Scoring predictions only needs the standings, not the wildcard crawl.
+    graph.add("predictions", lambda sheet, layout, write_wdc, write_wcc: update_prediction_points(sheet, layout),
+              deps=["sheet", "layout", "write_wdc", "write_wcc"])
+    # A failed wildcard scrape leaves its rows as they are on the sheet; the others are still written.
+    graph.add("wildcard_updates", wildcard_updates, optional=["fastest_laps", "dnfs_podiums", "poles"])
+    graph.add("wildcards",
+              lambda sheet, layout, wildcard_updates: update_wildcard_scores(sheet, wildcard_updates, layout),
+              deps=["sheet", "layout", "wildcard_updates"])
+    graph.add("raceweek", lambda sheet: int(sheet.acell("B2").value), deps=["sheet"])
+    # Totals come from this run's tables, not from reading the sheet's formulas back after the writes.
+    graph.add("totals",
+              lambda predictions, wildcards, wildcard_updates:
+                  calculate_totals(predictions, wildcards, wildcard_updates),
+              deps=["predictions", "wildcards", "wildcard_updates"])
+    graph.add("points_tracker",
+              lambda sheet, raceweek, totals:
+                  update_points_tracker(sheet=sheet, current_raceweek=raceweek, totals=totals),
+              deps=["sheet", "raceweek", "totals"])
+    # Catch up tracker rows of raceweeks no run wrote; they go out in the same flush.
+    graph.add("backfill",
+              lambda sheet, raceweek, predictions, wildcards, wdc, wcc:
+                  backfill_tracker(sheet, current_raceweek=raceweek, scoreboard=predictions, wildcards=wildcards,
+                                   wdc=wdc, wcc=wcc),
+              deps=["sheet", "raceweek", "predictions", "wildcards", "wdc", "wcc"])
+    # The log and the flush wait for every writer but need only the snapshot: a failed task
+    # leaves its own ranges unwritten and everything else is still sent.
+    writers = ["write_wdc", "write_wcc", "predictions", "wildcards", "points_tracker", "backfill"]
+    graph.add("log_update", lambda sheet, **writes: log_changes(sheet), deps=["sheet"], optional=writers)
+    graph.add("flush", lambda sheet, log_update: sheet.flush(), deps=["sheet"], optional=["log_update"])
+
+
+def run_season_tasks() -> Tuple[Dict[str, Any], List[str]]:
+    """Scrape and compute the season data once, returning its results and failed task names."""
+    graph = TaskGraph()
+    add_season_tasks(graph)
+    with PERF.stage("season"):
+        return graph.run(), graph.failed
+
+
+def update_worksheet(worksheet, season: Optional[Tuple[Dict[str, Any], List[str]]] = None) -> Optional[int]:
+    """
+    Update all standings and points for the current raceweek on one worksheet.
+
+    Args:
+        worksheet: The gspread worksheet.
+        season (tuple): Shared output of run_season_tasks; scraped here when not given.
+
+    Returns:
+        Optional[int]: The raceweek written, or None if the writes were not sent.
+    """
+    graph = TaskGraph()
+    if season is None:
+        add_season_tasks(graph)
+        season = ({}, [])
+    add_sheet_tasks(graph)
+    results, failed = season
+    results = graph.run(inputs={**results, "worksheet": worksheet}, failed=failed)
+    if "flush" not in results:
+        logger.warning("Writes not sent for %s; failed tasks: %s", worksheet.title, ", ".join(graph.failed))
+        return None
+    return results.get("raceweek")
+
+
+def calculate_raceweek_points(sh, sheet: int, season: Optional[Tuple[Dict[str, Any], List[str]]] = None) -> Optional[int]:
     """Update all standings and points for the current raceweek in the Google Sheet."""
-    ps = sh.get_worksheet(sheet)
-    threads = [
-        td.Thread(target=update_standings, args=(ps, "drivers", ["Nationality", "Car", "Pos"], WDC)),
-        td.Thread(target=update_standings, args=(ps, "team", ["Pos"], WCC)),
-    ]
-    for t in threads:
-        t.start()
-    for t in threads:
-        t.join()
-        
-    update_wildcard_scores(ps)
-    update_prediction_points(ps)
-    
-        
-    current_raceweek = int(ps.acell("B2").value)
-    update_points_tracker(sheet=ps, current_raceweek=current_raceweek)
-    
-    log_update(ps)
+    return update_worksheet(sh.get_worksheet(sheet), season)
+
+
+def update_league(key: str, sheet: int, season) -> Optional[int]:
+    """Update one league's worksheet from the shared season data, returning the raceweek written."""
+    name = LEAGUES[key][sheet]
+    logger.info("\nUpdating sheet %s\n%s", name, "~" * 75)
+    try:
+        with PERF.stage(f"sheet.{name}"):
+            raceweek = update_worksheet(CLIENT.worksheet(key, sheet), season)
+        if raceweek is None:
+            logger.warning("Sheet %s not updated\n%s", name, "#" * 76)
+        else:
+            logger.info("Updated sheet %s\n%s", name, "#" * 76)
+        return raceweek
+    except Exception as e:
+        logger.error("Error updating sheet %s: %s", name, e)
+        return None
 
-def update():
+
+def update() -> Dict[Tuple[str, int], Optional[int]]:
+    """
+    Update every league for the current raceweek.
+
+    Returns:
+        dict: The raceweek written to each (spreadsheet key, worksheet index), None where it failed.
+    """
+    configure_logging()  # the `update` script enters here; a no-op once logging is set up
     start = time.time()
     
-    sh = authorize_google_sheet(CREDS, sskey)
-    
-    for i in list(SHEETS.keys()):
+    targets = [(key, sheet) for key, sheets in LEAGUES.items() for sheet in sheets]
     
-        logger.info("\nUpdating sheet %s\n%s", SHEETS.get(i), "~" * 75)
-        calculate_raceweek_points(sh, i)
-        logger.info("Updated sheet %s\n%s", SHEETS.get(i), "#" * 76)
+    # The run's stage timings, Sheets requests and HTTP traffic are written out as it ends.
+    with perf_run("update"), run_scope():
+        # Every league scores against the same season data: scrape it once, then fan out the writes.
+        season = run_season_tasks()
+        with ThreadPoolExecutor(max_workers=SHEET_WORKERS) as executor:
+            written = list(executor.map(lambda target: update_league(*target, season), targets))
     
-    logger.info("Total update time: %ss", time.time() - start)
+    if ENGINE.cache:
+        logger.info("HTTP cache: %s", ENGINE.cache.stats())
+    logger.info("Total update time: %ss (%d sheets)", time.time() - start, len(targets))
+    return dict(zip(targets, written))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Driver and team registry.
+
+Every driver and team gets a dense integer ID, built once from config.NAME_CONVERSION.
+Raw strings from the website or the sheet ("Max VerstappenVER", "McLaren Mercedes",
+"Verstappen") resolve to IDs through a memoised lookup, so standings, counts and
+predictions can be held as numpy arrays indexed by ID.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import *
+
+MISSING = -1
+
+
+class Registry:
+    """
+    Dense integer IDs for drivers and teams.
+
+    IDs follow the order of the conversion mapping and never change for the life of
+    the registry; adding a driver mid-season appends a new ID.
+
+    Attributes:
+        names (List[str]): Display name of each ID.
+        is_team (List[bool]): Whether each ID is a team.
+    """
+
+    def __init__(self, conversion: Dict[str, str] = NAME_CONVERSION, drivers: int = TOT_DRIVERS) -> None:
+        self._lock = threading.Lock()
+        self.names: List[str] = []
+        self.is_team: List[bool] = []
+        self._aliases: Dict[str, int] = {}
+        self._codes: Dict[str, int] = {}
+        self._memo: Dict[str, int] = {}
+        for i, (raw, name) in enumerate(conversion.items()):
+            self.add(raw, name, team=i >= drivers)
+
+    def __repr__(self) -> str:
+        return f"Registry(drivers={len(self.drivers)}, teams={len(self.teams)})"
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, raw: str, name: str, team: bool = False) -> int:
+        """
+        Register a scraped key (driver code or team name) for a display name.
+
+        Args:
+            raw (str): The key as scraped, e.g. "COL" or "Alpine Renault".
+            name (str): The display name used on the sheet.
+            team (bool): Whether this is a team.
+
+        Returns:
+            int: The ID, reusing the existing one if the display name is known.
+        """
+        with self._lock:
+            id_ = self._aliases.get(name)
+            if id_ is None:
+                id_ = len(self.names)
+                self.names.append(name)
+                self.is_team.append(team)
+                self._aliases[name] = id_
+            self._aliases[raw] = id_
+            if not team:
+                self._codes[raw] = id_
+            self._memo.clear()
+        return id_
+
+    def resolve(self, raw) -> int:
+        """Return the ID of a raw driver/team string, or MISSING."""
+        key = str(raw)
+        id_ = self._memo.get(key)
+        if id_ is None:
+            # Exact key or display name first, then the driver code that ends driver cells.
+            id_ = self._aliases.get(key, self._codes.get(key[-3:], MISSING))
+            self._memo[key] = id_
+        return id_
+
+    def resolve_many(self, values: Iterable) -> np.ndarray:
+        """Resolve an array of raw strings (any shape), with blanks and NaN mapping to MISSING."""
+        values = np.asarray(values, dtype=object)
+        codes, uniques = pd.factorize(values.ravel())
+        ids = np.array([self.resolve(u) for u in uniques] + [MISSING], dtype=np.int64)
+        return ids[codes].reshape(values.shape)
+
+    def name(self, raw) -> Optional[str]:
+        """Return the display name for a raw string, or None if unknown."""
+        id_ = self.resolve(raw)
+        return None if id_ == MISSING else self.names[id_]
+
+    ## Views ##
+
+    @property
+    def driver_ids(self) -> np.ndarray:
+        return np.flatnonzero(~np.array(self.is_team, dtype=bool))
+
+    @property
+    def team_ids(self) -> np.ndarray:
+        return np.flatnonzero(np.array(self.is_team, dtype=bool))
+
+    @property
+    def drivers(self) -> List[str]:
+        return [self.names[i] for i in self.driver_ids]
+
+    @property
+    def teams(self) -> List[str]:
+        return [self.names[i] for i in self.team_ids]
+
+    ## Arrays indexed by ID ##
+
+    def count(self, raw_names: Iterable) -> np.ndarray:
+        """Count occurrences of each driver/team in raw strings, as an array indexed by ID."""
+        ids = self.resolve_many(list(raw_names))
+        return np.bincount(ids[ids != MISSING], minlength=len(self))
+
+    def from_dict(self, values: Dict[str, float], fill=0, dtype=np.int64) -> np.ndarray:
+        """Scatter a {name: value} mapping into an array indexed by ID (unknown names dropped)."""
+        table = np.full(len(self), fill, dtype=dtype)
+        ids = self.resolve_many(list(values))
+        known = ids != MISSING
+        table[ids[known]] = np.asarray(list(values.values()), dtype=dtype)[known]
+        return table
+
+    def to_dict(self, counts: np.ndarray) -> Dict[str, int]:
+        """Return the non-zero entries of an ID-indexed count array as {display name: count}."""
+        return {self.names[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+
+# Process-wide registry; call REGISTRY.add(...) for mid-season driver changes.
+REGISTRY = Registry()
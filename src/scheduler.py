@@ -9,27 +9,127 @@ It then computes an update window.
 If the current UTC time falls within that window;
     it will check every few mins whether the race results have been posted.
 If so, it runs the updater, making sure only to move on if the raceweek has been updated on the sheet.
+
+The scheduler is a long-running daemon: updates run in this process, so the authorized
+Sheets client, HTTP connection pools and caches stay warm between polls, and a failed
+attempt is logged and retried rather than taking the process down. SIGTERM/SIGINT stop it
+cleanly between steps.
+
+Only the standard library is imported up front: the fetch engine, page scanner and updater
+(and with them pandas and gspread) load on first use, so the scheduler starts quickly and
+`next-race` / `--check` answer from the local schedule and state files alone.
+
+    python scheduler.py              # run the daemon
+    python scheduler.py next-race    # print the next race and its update window as JSON
+    python scheduler.py --check      # the same, exiting 1 if no race is scheduled (health checks)
 """
 
-import time
-import subprocess
+import argparse
+import hashlib
+import json
+import signal
+import statistics
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from config import *
-from gSheet_utils import get_last_calculated_raceweek, get_race, get_next_race, get_next_race_to_calculate
-from scraping_utils import scrape_table_from_url
+from gSheet_utils import CLIENT, SCHEDULE, get_last_calculated_raceweek, get_next_race_to_calculate, race_start
+from perf import PERF
+
+# Set by SIGTERM/SIGINT; every wait in the daemon wakes up on it.
+STOP = threading.Event()
+
+
+def sleep(seconds: float) -> None:
+    """Wait for the given time, returning early if the scheduler is stopping."""
+    STOP.wait(max(seconds, 0))
+
+
+def request_stop(signum, frame) -> None:
+    logger.info("Received signal %s; stopping scheduler.", signum)
+    STOP.set()
+
+
+## Scheduler state ##
+
+class SchedulerState:
+    """
+    The last raceweek this process wrote or read from the sheet, kept in a local JSON file.
+
+    The scheduler trusts it instead of reading the sheet on every poll, and re-reads the
+    sheet only when the state is missing or older than STATE_RECHECK_HOURS.
+
+    Attributes:
+        path (str): The JSON state file.
+        raceweek (Optional[int]): The last known raceweek.
+        checked_at (Optional[datetime]): When that raceweek was written or read.
+    """
+
+    def __init__(self, path: str = SCHEDULER_STATE) -> None:
+        self.path = path
+        self.raceweek: Optional[int] = None
+        self.checked_at: Optional[datetime] = None
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            self.raceweek = int(state["raceweek"])
+            self.checked_at = datetime.fromisoformat(state["checked_at"])
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable scheduler state %s: %s", path, e)
+
+    def __repr__(self) -> str:
+        return f"SchedulerState(raceweek={self.raceweek}, checked_at={self.checked_at})"
+
+    def stale(self) -> bool:
+        """Return True if the sheet should be read again."""
+        if self.raceweek is None or self.checked_at is None:
+            return True
+        return datetime.now(timezone.utc) - self.checked_at > timedelta(hours=STATE_RECHECK_HOURS)
+
+    def record(self, raceweek: int) -> None:
+        """Remember a raceweek and atomically save the state file."""
+        self.raceweek, self.checked_at = raceweek, datetime.now(timezone.utc)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"raceweek": raceweek, "checked_at": self.checked_at.isoformat()}, f)
+        os.replace(tmp, self.path)
+
+
+STATE = SchedulerState()
+
+
+def current_raceweek() -> int:
+    """Return the last calculated raceweek, reading the sheet only if the local state is stale."""
+    if not STATE.stale():
+        return STATE.raceweek # type: ignore
+    raceweek = get_last_calculated_raceweek()
+    # 0 is also what a failed read returns, so it is not trusted for later polls.
+    if raceweek:
+        STATE.record(raceweek)
+    return raceweek
 
 
 ## Schedule builders ##
-def run_update() -> None:
-    """Run the F1 Predictions Updater script."""
+def run_update() -> Optional[int]:
+    """Run the F1 Predictions Updater in this process, returning the raceweek it wrote (None on failure)."""
     logger.info("Running F1 Predictions Updater...")
     try:
-        subprocess.run(["python3", "googleSheet_resources.py"], check=True)
+        import predictions_updater
+        written = predictions_updater.update().get((sskey, CURRENT_SHEET))
         logger.info("F1 Predictions Updater Run\nChecking if succesful.")
-    except subprocess.CalledProcessError as e:
-        logger.error("Error running F1 Predictions Updater: %s", e)
+    except Exception:
+        logger.exception("Error running F1 Predictions Updater")
+        written = None
+    if written is None:
+        # Authorize afresh on the next attempt, in case the client is at fault.
+        CLIENT.reset()
+    else:
+        STATE.record(written)
+    return written
 
 
 def calculate_window(next_race: dict) -> Optional[Tuple[datetime, datetime]]:
@@ -50,6 +150,25 @@ def calculate_window(next_race: dict) -> Optional[Tuple[datetime, datetime]]:
         return None
 
 
+def next_update_window(raceweek: int) -> Tuple[Optional[dict], Optional[Tuple[datetime, datetime]]]:
+    """
+    Return the next race to calculate after raceweek and its update window.
+
+    Races whose window has closed without the sheet moving on are skipped: waiting on them
+    again would return at once, and the next update catches their results up.
+    """
+    race = get_next_race_to_calculate(raceweek)
+    now = datetime.now(timezone.utc)
+    while race:
+        window = calculate_window(race)
+        if not window or now < window[1]:
+            return race, window
+        logger.warning("Update window for %s closed at %s without an update; moving on to the next race.",
+                       race.get("name"), window[1])
+        race = get_next_race_to_calculate(race["raceweek"])
+    return None, None
+
+
 def should_run_update(next_race: dict) -> bool:
     """Return True if the current time is within the update window for the next race."""
     window = calculate_window(next_race)
@@ -66,73 +185,218 @@ def should_run_update(next_race: dict) -> bool:
 
 ## Scheduler Scraping/check functions ## 
 
-def result_is_ready(raceweek: int) -> bool:
-    """ Checks a result link as to whether it is ready to be scraped"""
-    race_details = get_race(raceweek=raceweek)
-    check = scrape_table_from_url(race_details["results"])
-    if check.empty: 
-        logger.info(f"{race_details['name']} not ready to be scraped")
-        logger.debug("Check results table:")        
-        logger.debug(check)
-        return False
-    else: 
-        return True
+class ResultsProbe:
+    """
+    Cheap check for whether a race's results have been published.
 
+    Each poll is a conditional GET through the shared fetch engine, so an unchanged page
+    costs a 304 and no body. A page whose fingerprint has not changed reuses the previous
+    verdict; a changed page is only scanned for a results table with data cells, without
+    building a DataFrame. The first time a race's results are seen, the delay since the
+    race start is appended to a JSONL log, to help tune OFFSET_HOURS.
+
+    Attributes:
+        latency_log (str): JSONL file of how long results took to appear.
+        latencies (List[float]): Hours from race start to results, from the log.
+    """
+
+    def __init__(self, latency_log: str = RESULTS_LATENCY_LOG) -> None:
+        self.latency_log = latency_log
+        self.latencies: List[float] = []
+        self._seen: Dict[str, Tuple[str, bool]] = {}
+        self._misses: Dict[str, int] = {}
+        self._logged: set = set()
+        try:
+            with open(latency_log) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.latencies.append(entry["hours_after_start"])
+                    self._logged.add(entry["results"])
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable results latency log %s: %s", latency_log, e)
+
+    def __repr__(self) -> str:
+        return f"ResultsProbe(latency_log={self.latency_log!r}, races_logged={len(self.latencies)})"
+
+    def ready(self, race: dict) -> bool:
+        """Return True if the race's results page has a populated results table."""
+        from fetch_utils import ENGINE, FetchError
+        from scraping_utils import has_results_table
+        url = race["results"]
+        try:
+            with PERF.stage("probe"):
+                body = ENGINE.fetch(url)
+        except FetchError as e:
+            logger.info("Results probe for %s failed: %s", race.get("name"), e)
+            return False
+        fingerprint = hashlib.sha1(body).hexdigest()
+        seen = self._seen.get(url)
+        if seen and seen[0] == fingerprint:
+            ready = seen[1]
+        else:
+            ready = has_results_table(body)
+            self._seen[url] = (fingerprint, ready)
+        if ready:
+            self._record_latency(race)
+        else:
+            logger.info(f"{race['name']} not ready to be scraped")
+        return ready
+
+    def expected_at(self, race: dict) -> Optional[datetime]:
+        """When results are expected: race start plus the median logged delay (OFFSET_HOURS before any)."""
+        start = race_start(race)
+        if start is None:
+            return None
+        hours = statistics.median(self.latencies) if self.latencies else OFFSET_HOURS
+        return start + timedelta(hours=hours)
+
+    def next_delay(self, race: dict) -> float:
+        """
+        Seconds to wait before the next poll after a miss.
+
+        Polls every POLL_MIN_INTERVAL up to the expected publish time, then back off by
+        POLL_BACKOFF per miss, up to UPDATE_INTERVAL.
+        """
+        expected = self.expected_at(race)
+        now = datetime.now(timezone.utc)
+        if expected is None:
+            return UPDATE_INTERVAL
+        if now < expected:
+            return min(max((expected - now).total_seconds(), POLL_MIN_INTERVAL), UPDATE_INTERVAL)
+        misses = self._misses[race["results"]] = self._misses.get(race["results"], 0) + 1
+        return min(POLL_MIN_INTERVAL * POLL_BACKOFF ** (misses - 1), UPDATE_INTERVAL)
+
+    def _record_latency(self, race: dict) -> None:
+        """Append how long after the race start its results were first seen (once per race)."""
+        start = race_start(race)
+        if race["results"] in self._logged or start is None:
+            return
+        detected = datetime.now(timezone.utc)
+        hours = (detected - start).total_seconds() / 3600
+        self._logged.add(race["results"])
+        self.latencies.append(hours)
+        logger.info("%s results detected %.2f hours after the start (median %.2f over %d races).",
+                    race["name"], hours, statistics.median(self.latencies), len(self.latencies))
+        try:
+            os.makedirs(os.path.dirname(self.latency_log), exist_ok=True)
+            with open(self.latency_log, "a") as f:
+                f.write(json.dumps({"raceweek": race.get("raceweek"), "name": race.get("name"),
+                                    "results": race["results"], "race_time": start.isoformat(),
+                                    "detected_at": detected.isoformat(), "hours_after_start": round(hours, 3)}) + "\n")
+        except OSError as e:
+            logger.warning("Could not write results latency log: %s", e)
+
+
+PROBE = ResultsProbe()
+
+
+def result_is_ready(race: dict) -> bool:
+    """ Checks a result link as to whether it is ready to be scraped"""
+    return PROBE.ready(race)
 
-    
 
 ### Main ###
 
+def next_race_status(now: Optional[datetime] = None) -> dict:
+    """
+    Describe the next race to calculate and its update window, from the local state and
+    schedule files only (no sheet or network access).
+
+    The last known raceweek is used even when stale; without one, the next race to start is given.
+    """
+    now = now or datetime.now(timezone.utc)
+    race = get_next_race_to_calculate(STATE.raceweek) if STATE.raceweek is not None else SCHEDULE.next_race(now)
+    status = {"raceweek": STATE.raceweek, "state_stale": STATE.stale(),
+              "next_race": None, "next_raceweek": None, "race_time": None,
+              "window_start": None, "window_end": None, "in_window": False}
+    window = calculate_window(race) if race else None
+    if race:
+        start = race_start(race)
+        status.update(next_race=race.get("name"), next_raceweek=race.get("raceweek"),
+                      race_time=start.isoformat() if start else None)
+    if window:
+        status.update(window_start=window[0].isoformat(), window_end=window[1].isoformat(),
+                      in_window=window[0] <= now < window[1])
+    return status
+
+
 def main() -> None:
+    configure_logging()  # the `main` script enters here; a no-op once logging is set up
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
     logger.info("Scheduler started.")
-    while True:
-        current_week = get_last_calculated_raceweek()
-        next_race = get_next_race_to_calculate(current_week)
-        
-        if not next_race:
-            logger.info("No upcoming race found. Sleeping for 1 hour.")
-            time.sleep(3600)
-            continue
-
-        window = calculate_window(next_race)
-        if not window:
-            logger.error("Could not calculate window for next race. Sleeping for 1 hour.")
-            time.sleep(3600)
-            continue
-
-        start_window, end_window = window
-        now = datetime.now(timezone.utc)
-        # If current time is before window start, sleep until the window begins.
-        if now < start_window:
-            sleep_secs = (start_window - now).total_seconds()
-            logger.info("Next race '%s' update window starts at %s. Sleeping for %.0f seconds.",
-                        next_race.get("name"), start_window, sleep_secs)
-            time.sleep(sleep_secs)
-            continue
-
-        # We're inside the window. Poll every 20 minutes until the sheet updates.
-        logger.info("Within update window for raceweek %d; polling every few minutes.", next_race["raceweek"])
-        while should_run_update(next_race) and get_last_calculated_raceweek() == current_week:
-            if result_is_ready(current_week+1):
-                run_update()
-            else:
-                logger.info("Result not uploaded yet; checking again shortly...")
-                time.sleep(UPDATE_INTERVAL)
+    while not STOP.is_set():
+        try:
+            schedule_next_update()
+        except Exception:
+            # Keep the daemon alive; whatever failed is retried on the next pass.
+            logger.exception("Scheduler error; retrying in %d seconds.", UPDATE_INTERVAL)
+            sleep(UPDATE_INTERVAL)
+    logger.info("Scheduler stopped.")
 
-        logger.info("Raceweek updated (current raceweek: %d). Returning to scheduling for next race.",
-                    get_last_calculated_raceweek())
 
-        # Then recalc sleep time until next window.
-        now = datetime.now(timezone.utc)
-        window = calculate_window(next_race)
-        if window:
-            start_window, _ = window
-            sleep_secs = max((start_window - now).total_seconds(), 0)
-            logger.info("Sleeping for %.0f seconds until next update window.", sleep_secs)
-            time.sleep(sleep_secs)
+def schedule_next_update() -> None:
+    """
+    Wait for the next race's update window, then poll and update until the sheet moves on.
+
+    Every pass either sleeps until a window opens or polls inside one, so a window that
+    closes without an update never leaves the daemon spinning.
+    """
+    current_week = current_raceweek()
+    next_race, window = next_update_window(current_week)
+    
+    if not next_race:
+        logger.info("No upcoming race found. Sleeping for 1 hour.")
+        sleep(3600)
+        return
+
+    if not window:
+        logger.error("Could not calculate window for next race. Sleeping for 1 hour.")
+        sleep(3600)
+        return
+
+    start_window, end_window = window
+    now = datetime.now(timezone.utc)
+    # If current time is before window start, sleep until the window begins.
+    if now < start_window:
+        sleep_secs = (start_window - now).total_seconds()
+        logger.info("Next race '%s' update window starts at %s. Sleeping for %.0f seconds.",
+                    next_race.get("name"), start_window, sleep_secs)
+        sleep(sleep_secs)
+        return
+
+    # We're inside the window. Poll (adaptively) until the sheet updates.
+    logger.info("Within update window for raceweek %d; polling every few minutes.", next_race["raceweek"])
+    raceweek = current_week
+    while not STOP.is_set() and should_run_update(next_race):
+        if result_is_ready(next_race):
+            written = run_update()
+            if written is not None and written != current_week:
+                raceweek = written
+                break
+            logger.info("Sheet not updated yet; trying again shortly...")
+            sleep(UPDATE_INTERVAL)
         else:
-            logger.info("Sleeping for 1 hour.")
-            time.sleep(3600)
+            delay = PROBE.next_delay(next_race)
+            logger.info("Result not uploaded yet; checking again in %.0f seconds...", delay)
+            sleep(delay)
+
+    # The next pass sleeps until the following race's window opens.
+    if raceweek != current_week:
+        logger.info("Raceweek updated (current raceweek: %d). Returning to scheduling for next race.",
+                    raceweek)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="F1 predictions scheduler")
+    parser.add_argument("command", nargs="?", choices=["run", "next-race"], default="run",
+                        help="run the daemon (default), or print the next race and its update window")
+    parser.add_argument("--check", action="store_true",
+                        help="print the next race as next-race does, exiting 1 if none is scheduled")
+    args = parser.parse_args()
+    if args.check or args.command == "next-race":
+        status = next_race_status()
+        print(json.dumps(status))
+        raise SystemExit(1 if args.check and not status["window_start"] else 0)
     main()
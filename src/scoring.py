@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Vectorised prediction scoring.
+
+Every player's predictions are encoded once as an integer matrix of registry IDs
+(players x positions), so scores, wildcard ranks and totals for any number of players
+come from a handful of numpy operations instead of per-player pandas work.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from config import *
+from registry import REGISTRY, MISSING
+from tables import UNNAMED_COLUMN
+
+## Encoding ##
+
+def encode(names) -> np.ndarray:
+    """Return the registry IDs of an array of names, MISSING where a name is unknown (or blank)."""
+    return REGISTRY.resolve_many(names)
+
+def lookup(ids: np.ndarray, table: np.ndarray, fill=MISSING) -> np.ndarray:
+    """
+    Index a per-ID table with an ID array, returning fill wherever an ID is MISSING.
+    A 2-D table (IDs x weeks) gives a trailing weeks axis on the result.
+    """
+    # The extra trailing slot catches MISSING (-1) ids.
+    padded = np.concatenate([table, np.full((1, *table.shape[1:]), fill, dtype=table.dtype)])
+    return padded[ids]
+
+def player_columns(table: pd.DataFrame, first: int = 0) -> Tuple[List[str], List[int]]:
+    """
+    Discover the players of a table from its header.
+
+    Tables hold one (prediction, score) column pair per player, starting at column `first`;
+    the player's name heads the prediction column. Pairs with a blank header are skipped.
+
+    Args:
+        table (pd.DataFrame): The scoreboard or wildcard table.
+        first (int): Position of the first player's prediction column.
+
+    Returns:
+        Tuple[List[str], List[int]]: Player names and the positions of their prediction columns.
+    """
+    players, columns = [], []
+    for col in range(first, len(table.columns) - 1, 2):
+        name = str(table.columns[col])
+        if name and not UNNAMED_COLUMN.search(name):
+            players.append(name)
+            columns.append(col)
+    return players, columns
+
+
+## Scores ##
+
+def prediction_scores(scoreboard: pd.DataFrame, driver_positions: np.ndarray, team_positions: np.ndarray) -> pd.DataFrame:
+    """
+    Score every player's predictions against the current standings.
+
+    A prediction on row r scores |r - actual position| (driver rows first, then team rows);
+    unknown names score 0.
+
+    Args:
+        scoreboard (pd.DataFrame): The SCOREBOARD table.
+        driver_positions (np.ndarray): Standings position per registry ID (see TableCoords.get_positions).
+        team_positions (np.ndarray): Team standings position per registry ID.
+
+    Returns:
+        pd.DataFrame: The scoreboard with every score column rewritten.
+    """
+    _, columns = player_columns(scoreboard)
+    ids = encode(scoreboard.iloc[:, columns].to_numpy(dtype=object).T)  # players x positions
+    rows = np.arange(len(scoreboard))
+    is_driver = rows < PREDICTION_DRIVERS
+    target = np.where(is_driver, rows, rows - PREDICTION_DRIVERS)
+    actual = np.where(is_driver,
+                      lookup(ids, driver_positions),
+                      lookup(ids, team_positions))
+    scores = np.where(actual == MISSING, 0, np.abs(target - actual))
+    scoreboard.iloc[:, [col + 1 for col in columns]] = scores.T
+    return scoreboard
+
+def wildcard_ranks(wc_df: pd.DataFrame, row: int, ranks: pd.Series) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Write each player's rank for one wildcard row of the WILDCARD_POINTS table.
+
+    Args:
+        wc_df (pd.DataFrame): The wildcard table (labels in column 0, then player pairs).
+        row (int): The wildcard's row.
+        ranks (pd.Series): Rank per driver/team name.
+
+    Returns:
+        Tuple[pd.DataFrame, List[str]]: The updated table and the predictions that had no rank.
+    """
+    _, columns = player_columns(wc_df, first=1)
+    predictions = wc_df.iloc[row, columns].to_numpy(dtype=object)
+    table = REGISTRY.from_dict(ranks.to_dict(), fill=np.nan, dtype=float)
+    values = lookup(encode(predictions), table, fill=np.nan)
+    # Rebuild the (small) table from one object block; a row-wise setitem goes column by column.
+    block = wc_df.to_numpy(dtype=object, copy=True)  # an all-object frame would hand back its own data
+    block[row, [col + 1 for col in columns]] = np.where(np.isnan(values), None, values)
+    wc_df = pd.DataFrame(block, index=wc_df.index, columns=wc_df.columns)
+    return wc_df, [str(p) for p, v in zip(predictions, values) if np.isnan(v)]
+
+def score_totals(scoreboard: pd.DataFrame) -> pd.Series:
+    """Return each player's total prediction score, indexed by player name."""
+    players, columns = player_columns(scoreboard)
+    scores = scoreboard.iloc[:, [c + 1 for c in columns]].apply(pd.to_numeric, errors="coerce")
+    return pd.Series(np.nansum(scores.to_numpy(dtype=float), axis=0), index=players)
+
+def player_totals(scoreboard: pd.DataFrame, wildcards: pd.DataFrame) -> pd.Series:
+    """
+    Return each player's points total, as the PLAYERS_POINTS row adds it up on the sheet:
+    every prediction score plus every wildcard rank.
+
+    Args:
+        scoreboard (pd.DataFrame): The scored SCOREBOARD table.
+        wildcards (pd.DataFrame): The ranked WILDCARD_POINTS table.
+
+    Returns:
+        pd.Series: Integer totals indexed by player name, in sheet column order.
+    """
+    totals = score_totals(scoreboard)
+    _, columns = player_columns(wildcards, first=1)
+    ranks = wildcards.iloc[:, [c + 1 for c in columns]].apply(pd.to_numeric, errors="coerce")
+    ranks = np.nansum(ranks.to_numpy(dtype=float), axis=0)
+    if len(ranks) != len(totals):
+        raise ValueError(f"{len(totals)} players on the scoreboard but {len(ranks)} in the wildcards")
+    return (totals + ranks).round().astype(int)
+
+
+## Backfill ##
+
+def finish_counts(*finishes: np.ndarray) -> np.ndarray:
+    """
+    Count finishes in each position, one row per race.
+
+    Args:
+        *finishes (np.ndarray): Finishing positions (from 1, 0 for none) per registry ID (races x IDs),
+            e.g. the checkpointed "finish" and "second_finish" matrices.
+
+    Returns:
+        np.ndarray: Finishes per registry ID and position (races x IDs x positions), position 1 first.
+    """
+    places = max((int(f.max()) for f in finishes if f.size), default=0)
+    counts = np.zeros((*finishes[0].shape, places + 1), dtype=np.int64)
+    for f in finishes:
+        races, ids = np.nonzero(f)
+        np.add.at(counts, (races, ids, f[races, ids]), 1)
+    return counts[:, :, 1:]
+
+def standings_positions(points: np.ndarray, ids: np.ndarray, finishes: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Return championship positions from points, one row per week.
+
+    Ties on points are broken by countback, as the championships are: most wins, then most
+    second places, and so on.
+
+    Args:
+        points (np.ndarray): Points per registry ID (weeks x IDs).
+        ids (np.ndarray): The IDs in the championship (REGISTRY.driver_ids or team_ids).
+        finishes (Optional[np.ndarray]): Cumulative finishes per registry ID and position (weeks x IDs x positions,
+            see finish_counts).
+
+    Returns:
+        np.ndarray: Position (from 0) per registry ID (weeks x IDs), MISSING for IDs outside the championship.
+            Ties left after countback (or with no finishes given) keep registry order.
+    """
+    positions = np.full(points.shape, MISSING, dtype=np.int64)
+    for week, row in enumerate(points):
+        # lexsort sorts by its last key first.
+        countback = [] if finishes is None else list(-finishes[week][ids].T[::-1])
+        order = np.lexsort([*countback, -row[ids]])
+        positions[week, ids[order]] = np.arange(len(ids))
+    return positions
+
+def dense_ranks(counts: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """
+    Return wildcard ranks from counts, one row per week: 0 for the highest count, then 1, 2, ... per
+    distinct count below it, as wildcard tables are ranked. NaN for IDs outside `ids`.
+    """
+    counts = counts[:, ids]
+    ranks = np.full((len(counts), len(REGISTRY)), np.nan)
+    for week, row in enumerate(counts):
+        distinct = np.unique(row)[::-1]  # descending
+        ranks[week, ids] = np.searchsorted(-distinct, -row)
+    return ranks
+
+def weekly_totals(scoreboard: pd.DataFrame, wildcards: pd.DataFrame, points: np.ndarray,
+                  counts: Dict[int, np.ndarray], finishes: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Return each player's points total for a series of past weeks in one pass, as the
+    PLAYERS_POINTS row would have added it up then.
+
+    Args:
+        scoreboard (pd.DataFrame): The SCOREBOARD table (only the predictions are used).
+        wildcards (pd.DataFrame): The WILDCARD_POINTS table.
+        points (np.ndarray): Cumulative championship points per registry ID (weeks x IDs).
+        counts (Dict[int, np.ndarray]): Cumulative counts (weeks x IDs) per wildcard row.
+        finishes (Optional[np.ndarray]): Cumulative finishes (weeks x IDs x positions) to break ties on points.
+
+    Returns:
+        np.ndarray: Integer totals (weeks x players), players in sheet column order.
+
+    Raises:
+        ValueError: If a wildcard row not in counts is scored, since its past ranks are unknown.
+    """
+    _, columns = player_columns(scoreboard)
+    ids = encode(scoreboard.iloc[:, columns].to_numpy(dtype=object).T)  # players x positions
+    rows = np.arange(len(scoreboard))
+    is_driver = rows < PREDICTION_DRIVERS
+    target = np.where(is_driver, rows, rows - PREDICTION_DRIVERS)
+    drivers = standings_positions(points, REGISTRY.driver_ids, finishes)
+    teams = standings_positions(points, REGISTRY.team_ids, finishes)
+    # weeks x players x positions
+    actual = np.where(is_driver, lookup(ids, drivers.T).transpose(2, 0, 1), lookup(ids, teams.T).transpose(2, 0, 1))
+    totals = np.where(actual == MISSING, 0, np.abs(target - actual)).sum(axis=2).astype(float)
+
+    _, wc_columns = player_columns(wildcards, first=1)
+    if len(wc_columns) != len(columns):
+        raise ValueError(f"{len(columns)} players on the scoreboard but {len(wc_columns)} in the wildcards")
+    kept = [row for row in range(len(wildcards)) if row not in counts]
+    current = wildcards.iloc[kept, [c + 1 for c in wc_columns]].apply(pd.to_numeric, errors="coerce")
+    scored = [wildcards.index[row] for row, values in zip(kept, current.to_numpy(dtype=float))
+              if np.isfinite(values).any()]
+    if scored:
+        raise ValueError(f"wildcard rows {scored} are scored but have no per-race counts")
+    for row, row_counts in counts.items():
+        predictions = encode(wildcards.iloc[row, wc_columns].to_numpy(dtype=object))
+        ranks = dense_ranks(row_counts, REGISTRY.driver_ids)
+        totals += np.nan_to_num(lookup(predictions, ranks.T, fill=np.nan).T)
+    return totals.round().astype(int)
@@ -7,17 +7,29 @@ Scraping the f1 website for results links.
 Producing the race schedule JSON.
 """
 
-import urllib.request, urllib.error
 import bs4 as bs
+import numpy as np
 import pandas as pd
-from typing import List, Optional, Union
-from io import StringIO
-from datetime import datetime
+from typing import List, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from html.parser import HTMLParser
+from pandas.io.parsers import TextParser
 import re
 import json
+import time
 
 from config import *
-from gSheet_utils import get_race_result_urls
+from fetch_utils import ENGINE, FetchError, fetch, run_cached
+from gSheet_utils import get_race_result_urls, race_start, results_final_after
+from registry import REGISTRY, MISSING
+from perf import PERF
+from table_store import TABLE_STORE
+
+# Results of completed raceweeks never change, so the page cache can serve them without a request,
+# and the table store can serve their parsed tables without the page.
+if ENGINE.cache:
+    ENGINE.cache.final_after = results_final_after
+TABLE_STORE.final_after = results_final_after
 
 ## Helper fucntions ## 
 
@@ -52,45 +64,263 @@ def qualifying_scrape_url(url: str) -> str:
     """
     return url[:-11] + "qualifying"
 
-def extract_dnf_counts(df: pd.DataFrame) -> dict:
+def sprint_scrape_url(url: str) -> str:
+    """
+    Modify a race result URL to get the sprint results URL.
+    (Weekends without a sprint have no page there.)
+    """
+    return url[:-11] + "sprint-results"
+
+def grand_prix_key(name: str) -> str:
+    """Normalise a Grand Prix name or URL slug for matching ("Emilia-Romagna" -> "emiliaromagna")."""
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+def race_keys(race: dict) -> List[str]:
+    """Return the keys a race can be matched by: its schedule name and its results URL slug."""
+    keys = [grand_prix_key(race.get("name", ""))]
+    if race.get("results"):
+        keys.append(grand_prix_key(str(race["results"]).rstrip("/").split("/")[-2]))
+    return keys
+
+def extract_dnf_counts(df: pd.DataFrame) -> np.ndarray:
     """
-    Extract DNF counts from a race results DataFrame.
+    Extract DNF counts from a race results DataFrame, as an array indexed by registry ID.
     Count drivers for which the "Time/retired" column exactly equals "DNF".
     """
-    counts = {}
-    # Filter for rows with DNF status.
-    dnf_df = df[df["Time/retired"] == "DNF"]
-    for name in dnf_df["Driver"]:
-        key = NAME_CONVERSION.get(str(name[-3:]))
-        if key:
-            counts[key] = counts.get(key, 0) + 1
-    return counts
+    return REGISTRY.count(df.loc[df["Time/retired"] == "DNF", "Driver"])
 
-def extract_podium_counts(df: pd.DataFrame) -> dict:
+def extract_podium_counts(df: pd.DataFrame) -> np.ndarray:
     """
-    Extract podium counts from a race results DataFrame.
+    Extract podium counts from a race results DataFrame, as an array indexed by registry ID.
     Count drivers finishing in positions 1, 2, or 3.
     """
-    counts = {}
-    podium_df = df[df["Pos"].isin(["1", "2", "3"])]
-    for name in podium_df["Driver"]:
-        key = NAME_CONVERSION.get(str(name[-3:]))
-        if key:
-            counts[key] = counts.get(key, 0) + 1
-    return counts
+    return REGISTRY.count(df.loc[df["Pos"].isin(["1", "2", "3"]), "Driver"])
+
+def extract_points(df: pd.DataFrame) -> np.ndarray:
+    """
+    Extract championship points from a race results DataFrame, as an array indexed by registry ID.
+    Each driver's points count for the driver and for the team in the "Car" column.
+    """
+    points = pd.to_numeric(df["Pts"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    totals = np.zeros(len(REGISTRY))
+    for column in ("Driver", "Car"):
+        ids = REGISTRY.resolve_many(df[column])
+        known = ids != MISSING
+        totals += np.bincount(ids[known], weights=points[known], minlength=len(REGISTRY))
+    return totals.round().astype(np.int64)
+
+def extract_finishes(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extract classified finishing positions from a race results DataFrame, for breaking ties on points by countback.
+    Each driver gets its position in the first array; each team gets its better car's position in the first
+    array and its other car's in the second. Unclassified cars (NC, DQ) count as 0, i.e. no finish.
+    """
+    positions = pd.to_numeric(df["Pos"], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+    first, second = np.zeros(len(REGISTRY), dtype=np.int64), np.zeros(len(REGISTRY), dtype=np.int64)
+    drivers = REGISTRY.resolve_many(df["Driver"])
+    first[drivers[drivers != MISSING]] = positions[drivers != MISSING]
+    # Taken in finishing order, a team's first classified car is its better one.
+    for position, team in sorted(zip(positions, REGISTRY.resolve_many(df["Car"]))):
+        if team == MISSING or not position:
+            continue
+        if not first[team]:
+            first[team] = position
+        elif not second[team]:
+            second[team] = position
+    return first, second
 
-def extract_pole_counts(df: pd.DataFrame) -> dict:
+def standings_points(drivers: pd.DataFrame, teams: pd.DataFrame) -> np.ndarray:
     """
-    Extract pole position counts from a qualifying results DataFrame.
+    Extract championship points from the drivers' and teams' standings tables, as an array indexed by registry ID.
+    """
+    totals = np.zeros(len(REGISTRY), dtype=np.int64)
+    for df, column in ((drivers, "Driver"), (teams, "Team")):
+        points = pd.to_numeric(df["Pts"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        ids = REGISTRY.resolve_many(df[column])
+        known = ids != MISSING
+        totals[ids[known]] = points[known].round()
+    return totals
+
+def extract_pole_counts(df: pd.DataFrame) -> np.ndarray:
+    """
+    Extract pole position counts from a qualifying results DataFrame, as an array indexed by registry ID.
     Only the first row (pole position) is counted.
     """
-    counts = {}
-    if not df.empty:
-        name = df.iloc[0]["Driver"]
-        key = NAME_CONVERSION.get(str(name[-3:]))
-        if key:
-            counts[key] = 1
-    return counts
+    return REGISTRY.count(df["Driver"].iloc[:1])
+
+
+## Fast table extraction ##
+# Replaces BeautifulSoup + pd.read_html(flavor="bs4"), which parsed every page twice.
+# Output matches read_html: the same cell text clean-up, hidden elements dropped,
+# colspan/rowspan expanded, and the same TextParser type inference.
+
+TABLE_START = re.compile(rb"<table[\s>]", re.IGNORECASE)
+TABLE_END = re.compile(rb"</table\s*>", re.IGNORECASE)
+TABLE_CELL = re.compile(rb"<td[\s>]", re.IGNORECASE)
+HIDDEN_STYLE = re.compile(r"display:\s*none")
+CELL_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+def find_first_table(html: bytes) -> int:
+    """Return the offset of the first <table> tag outside scripts and comments, or -1."""
+    lowered = html.lower()
+    pos = 0
+    while (match := TABLE_START.search(html, pos)):
+        pos = match.start()
+        for opener, closer in ((b"<script", b"</script"), (b"<!--", b"-->")):
+            if lowered.rfind(opener, 0, pos) > lowered.rfind(closer, 0, pos):
+                pos = lowered.find(closer, pos)
+                break
+        else:
+            return pos
+        if pos < 0:
+            return -1
+    return -1
+
+
+def has_results_table(html: bytes) -> bool:
+    """Return True if the page's first table has at least one data cell, without parsing it."""
+    start = find_first_table(html)
+    if start < 0:
+        return False
+    end = TABLE_END.search(html, start)
+    return bool(TABLE_CELL.search(html, start, end.start() if end else len(html)))
+
+
+class FirstTableParser(HTMLParser):
+    """
+    Streams HTML from the start of a <table>, collecting row texts until the matching </table>.
+
+    Rows are gathered per section so <thead> rows come first and <tfoot> rows last.
+    Elements styled display:none (and <style> blocks) are skipped, as read_html does.
+    """
+
+    CHUNK = 16 * 1024
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.sections = {"thead": [], "tbody": [], "tfoot": []}
+        self.done = False
+        self._depth = 0      # <table> nesting level
+        self._hidden = 0     # open elements inside a hidden element
+        self._section = "tbody"
+        self._row: Optional[list] = None
+        self._cell: Optional[list] = None   # [text parts, rowspan, colspan]
+
+    def parse(self, html: bytes) -> List[List[str]]:
+        """Feed html (starting at a <table>) in chunks until the table closes; return its expanded rows."""
+        text = html.decode("utf-8", errors="replace")
+        for i in range(0, len(text), self.CHUNK):
+            self.feed(text[i:i + self.CHUNK])
+            if self.done:
+                break
+        self._close_row()
+        return expand_spans(self.sections["thead"] + self.sections["tbody"] + self.sections["tfoot"])
+
+    def handle_starttag(self, tag, attrs) -> None:
+        if self.done:
+            return
+        if self._hidden:
+            self._hidden += tag not in VOID_TAGS
+            return
+        attrs = dict(attrs)
+        if tag == "style" or HIDDEN_STYLE.search(attrs.get("style") or ""):
+            self._hidden = int(tag not in VOID_TAGS)
+            return
+        if tag == "table":
+            self._depth += 1
+            return
+        if tag == "br" and self._cell is not None:
+            self._cell[0].append("\n")  # read_html turns <br> into a line break.
+        if self._depth != 1:
+            return
+        if tag in self.sections:
+            self._close_row()
+            self._section = tag
+        elif tag == "tr":
+            self._close_row()
+            self._row = []
+        elif tag in ("td", "th"):
+            self._close_cell()
+            if self._row is None:
+                self._row = []
+            self._cell = [[], int(attrs.get("rowspan") or 1), int(attrs.get("colspan") or 1)]
+
+    def handle_endtag(self, tag) -> None:
+        if self.done:
+            return
+        if self._hidden:
+            self._hidden -= 1
+            return
+        if tag == "table":
+            self._depth -= 1
+            self.done = self._depth == 0
+        elif self._depth != 1:
+            return
+        elif tag in ("td", "th"):
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+        elif tag in self.sections:
+            self._close_row()
+            self._section = "tbody"
+
+    def handle_data(self, data) -> None:
+        if self._cell is not None and not self._hidden and not self.done:
+            self._cell[0].append(data)
+
+    def _close_cell(self) -> None:
+        if self._cell is not None and self._row is not None:
+            parts, rowspan, colspan = self._cell
+            self._row.append((CELL_WHITESPACE.sub(" ", "".join(parts).strip()), rowspan, colspan))
+        self._cell = None
+
+    def _close_row(self) -> None:
+        self._close_cell()
+        if self._row is not None:
+            self.sections[self._section].append(self._row)
+        self._row = None
+
+
+def expand_spans(rows: List[list]) -> List[List[str]]:
+    """Expand (text, rowspan, colspan) cells into plain text rows, copying spanned cells like read_html."""
+    if all(rowspan == colspan == 1 for row in rows for _, rowspan, colspan in row):
+        return [[text for text, _, _ in row] for row in rows]
+    texts_out = []
+    remainder: list = []  # (column index, text, rows left)
+    for row in rows:
+        texts, next_remainder, index = [], [], 0
+        for text, rowspan, colspan in row:
+            while remainder and remainder[0][0] <= index:
+                prev_i, prev_text, prev_rows = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rows > 1:
+                    next_remainder.append((prev_i, prev_text, prev_rows - 1))
+                index += 1
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+        for prev_i, prev_text, prev_rows in remainder:
+            texts.append(prev_text)
+            if prev_rows > 1:
+                next_remainder.append((prev_i, prev_text, prev_rows - 1))
+        texts_out.append(texts)
+        remainder = next_remainder
+    while remainder:
+        texts_out.append([text for _, text, _ in remainder])
+        remainder = [(i, text, n - 1) for i, text, n in remainder if n > 1]
+    return texts_out
+
+
+def rows_to_frame(rows: List[List[str]]) -> pd.DataFrame:
+    """Build the DataFrame once from text rows (first row is the header), inferring types as read_html does."""
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    with TextParser(rows, header=[0], thousands=",", decimal=".") as parser:
+        return parser.read()
 
 
 ### F1 Web Scraping Functions ###
@@ -100,7 +330,7 @@ def scrape_race_result_urls(year: int) -> List[str]:
     url = f"https://www.formula1.com/en/results/{year}/races"
     link = "https://www.formula1.com"
     try:
-        soup = bs.BeautifulSoup(urllib.request.urlopen(url).read(), "lxml")
+        soup = bs.BeautifulSoup(fetch(url), "lxml")
         return [link+a.get("href") for a in soup.find_all("a")
                 if a.get("href") and str(year) in a.get("href") and "race-result" in a.get("href")]
     except Exception as e:
@@ -108,41 +338,122 @@ def scrape_race_result_urls(year: int) -> List[str]:
         return []
 
 
+def parse_first_table(html: bytes, url: str = "") -> pd.DataFrame:
+    """Parse the first HTML table of a page into a DataFrame."""
+    started = time.perf_counter()
+    try:
+        return _parse_first_table(html, url)
+    finally:
+        PERF.page(url or "<page>", time.perf_counter() - started)
+
+
+def _parse_first_table(html: bytes, url: str) -> pd.DataFrame:
+    start = find_first_table(html)
+    if start < 0:
+        logger.warning("No table found at %s", url)
+        return pd.DataFrame()
+    rows = FirstTableParser().parse(html[start:])
+    if not rows:
+        logger.warning("Empty table at %s", url)
+        return pd.DataFrame()
+    return rows_to_frame(rows)
+
+
+def load_table(url: str) -> pd.DataFrame:
+    """
+    Return the first table of a page: from the table store if the page is final or its HTML
+    is unchanged, otherwise parsed from the HTML and stored.
+    """
+    if TABLE_STORE and (df := TABLE_STORE.get_final(url)) is not None:
+        return df
+    html = fetch(url)
+    if TABLE_STORE and (df := TABLE_STORE.get(url, html)) is not None:
+        return df
+    df = parse_first_table(html, url)
+    if TABLE_STORE:
+        TABLE_STORE.put(url, html, df)
+    return df
+
+
 def scrape_table_from_url(url: str) -> pd.DataFrame:
-    """Scrape the first HTML table from a URL into a DataFrame."""
+    """
+    Scrape the first HTML table from a URL into a DataFrame.
+
+    The frame is shared with every other caller in the run, and a stored table's numeric
+    columns map the table store read-only, so callers must not modify it in place.
+    """
     try:
-        soup = bs.BeautifulSoup(urllib.request.urlopen(url).read(), "lxml")
-        tables = soup.find_all("table")
-        if not tables:
-            logger.warning("No table found at %s", url)
-            return pd.DataFrame()
-        # Wrap the literal HTML string in StringIO to avoid FutureWarning.
-        return pd.read_html(StringIO(str(tables[0])), flavor="bs4", header=[0])[0]
-    except (urllib.error.HTTPError, Exception) as e:
+        # Stages asking for the same page in one run share a single fetch and parse.
+        return run_cached(("table", url), lambda: load_table(url))
+    except FetchError as e:
+        if e.status == 404:
+            # Expected for sessions a weekend did not have, e.g. sprint results without a sprint.
+            logger.info("No page at %s", url)
+        else:
+            logger.error("Error scraping %s: %s", url, e)
+        return pd.DataFrame()
+    except Exception as e:
         logger.error("Error scraping %s: %s", url, e)
         return pd.DataFrame()
 
 
+def scrape_sprint_points(race: dict) -> Optional[np.ndarray]:
+    """
+    Return a race weekend's sprint points, as an array indexed by registry ID.
+
+    Weekends the schedule marks as having no sprint are not fetched. Schedule entries scraped
+    before the flag existed are looked up, and only a missing page (404) means there was no
+    sprint; any other failure returns None, so the round is not recorded as sprint-free.
+    """
+    if race.get("sprint") is False:
+        return REGISTRY.count([])
+    url = sprint_scrape_url(race["results"])
+    try:
+        df = run_cached(("table", url), lambda: load_table(url))
+    except FetchError as e:
+        if e.status == 404:
+            logger.info("No sprint at %s", url)
+            return REGISTRY.count([])
+        logger.error("Error scraping %s: %s", url, e)
+        return None
+    except Exception as e:
+        logger.error("Error scraping %s: %s", url, e)
+        return None
+    if "Pts" not in df:
+        logger.warning("No sprint results table at %s", url)
+        return None
+    return extract_points(df)
+
+
+def scrape_tables_from_urls(urls: List[str]) -> List[pd.DataFrame]:
+    """Fetch and parse several pages in parallel, returning the first table of each in order."""
+    return ENGINE.map(scrape_table_from_url, urls)
+
+
 def scrape_f1_website(year: int, 
                       site: Optional[str] = None,
                       link: Optional[str] = None,
+                      links: Optional[List[str]] = None,
                       drop_cols: Optional[List[str]] = None,
                       all_race_URLs: bool = False
-                      ) -> Union[pd.DataFrame, List[str]]:
+                      ) -> Union[pd.DataFrame, List[str], List[pd.DataFrame]]:
     """
     Delegate scraping based on parameters:
-      - all_race_URLs: returns a list of race-result URLs.
+      - all_race_URLs: returns a list of race-result URLs for races that have started.
+      - links: scrapes the table from each full URL in parallel, returning them in order.
       - link: scrapes the table from the full URL.
       - site: scrapes the table from the site-specific URL.
     """
     if all_race_URLs:
-        return get_race_result_urls(year) # type: ignore this is type checked prior to getting here.
+        return get_race_result_urls(year, started_only=True) # type: ignore this is type checked prior to getting here.
+    if links is not None:
+        return scrape_tables_from_urls(links)
     if link:
         return scrape_table_from_url(link)
     if site:
         df = scrape_table_from_url(f"https://www.formula1.com/en/results/{year}/{site}")
-        df.drop(drop_cols, axis=1, inplace=True)
-        return df
+        # A failed scrape is an empty frame with no columns to drop; callers check for it.
+        return df.drop(drop_cols, axis=1) if not df.empty else df
     logger.error("No valid parameter provided to scrape_f1_website")
     return pd.DataFrame()
 
@@ -151,7 +462,7 @@ def fetch_race_links(year: int = YEAR) -> list:
     url = f"https://www.formula1.com/en/racing/{year}"
     logger.debug("Fetching URL: %s", url)
     try:
-        html = urllib.request.urlopen(url).read()
+        html = fetch(url)
         soup = bs.BeautifulSoup(html, "lxml")
         links = [
             a.get("href") for a in soup.find_all("a")
@@ -173,7 +484,7 @@ def scrape_race_details(link: str) -> dict:
     full_url = "https://www.formula1.com" + link
     logger.info("Scraping race details from: %s", full_url)
     try:
-        race_html = urllib.request.urlopen(full_url).read()
+        race_html = fetch(full_url)
         soup = bs.BeautifulSoup(race_html, "lxml")
         all_spans = [span.get_text(strip=True) for span in soup.find_all("span")]
         
@@ -203,48 +514,94 @@ def scrape_race_details(link: str) -> dict:
         else:
             race_datetime = extracted_time
 
-        race_name = link.split(f"/{YEAR}/")[-1].replace(".html", "")
-        return {"name": race_name, "date": raw_date, "time": race_datetime}
+        # Sprint weekends list a "Sprint" session alongside the race.
+        return {"name": race_name(link), "date": raw_date, "time": race_datetime, "sprint": "Sprint" in all_spans}
     except Exception as e:
         logger.error("Error scraping race details from %s: %s", full_url, e)
         return {}
 
 ## Main ##
 
-def populate_race_schedule():
-    race_links = fetch_race_links(YEAR)
+def race_name(link: str) -> str:
+    """Return a race's name (its URL slug) from a calendar link."""
+    return link.split(f"/{YEAR}/")[-1].replace(".html", "")
+
+
+def needs_details(race: Optional[dict], now: datetime) -> bool:
+    """
+    Return True if a schedule entry must be (re)scraped: it is missing, has no time/date,
+    or is a future race whose details are older than SCHEDULE_REFRESH_DAYS.
+    """
+    if not race or race.get("time") in (None, "N/A") or race.get("date") in (None, "", "N/A"):
+        return True
+    start, scraped = race_start(race), race.get("scraped_at")
+    if start is None or start <= now:
+        return False  # Past races keep their details (they can't be scraped after completion).
+    return not scraped or now - datetime.fromisoformat(scraped) > timedelta(days=SCHEDULE_REFRESH_DAYS)
+
+
+def read_schedule_file(path: str) -> List[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+    except ValueError as e:
+        logger.warning("Rebuilding unreadable race schedule %s: %s", path, e)
+        return []
+
+
+def populate_race_schedule(path: str = JSON_FILE, force: bool = False) -> None:
+    """
+    Build or refresh the race schedule JSON.
+
+    The calendar and results index are fetched together, then only the races whose
+    entries are missing or stale (see needs_details) have their pages fetched, all
+    concurrently. Entries are merged into the existing schedule by race name and the
+    file is replaced atomically.
+
+    Args:
+        path (str): The schedule JSON file.
+        force (bool): Re-scrape every race's details.
+    """
+    race_links, result_links = ENGINE.map(lambda scrape: scrape(YEAR), [fetch_race_links, scrape_race_result_urls])
     if not race_links:
         logger.error("No race links to process.")
         return
-    
-    result_links = scrape_race_result_urls(YEAR)
+
+    existing = {race.get("name"): race for race in read_schedule_file(path)}
+    # Result pages end ".../races/<id>/<name>/race-result"; pair them with races by name.
+    results_by_name = {url.rstrip("/").split("/")[-2]: url for url in result_links}
+    now = datetime.now(timezone.utc)
+    stale = [link for link in race_links if force or needs_details(existing.get(race_name(link)), now)]
+    scraped = dict(zip(stale, ENGINE.map(scrape_race_details, stale)))
+    logger.info("Scraped details for %d of %d races.", len(stale), len(race_links))
 
     schedule = []
-    raceweek = 1
-    for race, result in zip(race_links,result_links):
-        details = scrape_race_details(race)
+    for raceweek, link in enumerate(race_links, start=1):
+        name = race_name(link)
+        race = dict(existing.get(name) or {"name": name})
+        details = scraped.get(link) or {}
         if details.get("time") is not None and details.get("name"):
-            details["raceweek"] = raceweek
-            details["results"] = result
-            logger.info("Extracted race details: %s", details)
-            schedule.append(details)
-            raceweek += 1
-        else:
-            details["time"] = "N/A"
-            details["date"] = "N/A"
-            details["raceweek"] = raceweek
-            details["results"] = result
-            schedule.append(details)
-            raceweek += 1
-            logger.info("Race added without full details: %s", race)
+            race.update(details, time=str(details["time"]), scraped_at=now.isoformat())
+            logger.info("Extracted race details: %s", race)
+        elif link in scraped and needs_details(race, now):
+            race.setdefault("time", "N/A")
+            race.setdefault("date", "N/A")
+            logger.info("Race added without full details: %s", link)
             logger.warning("Fix required: Completed races currently cannot have time/date scraped after completion.")
-    
-    if schedule:
-        with open("race_schedule.json", "w") as f:
-            json.dump(schedule, f, default=str, indent=2)
-        logger.info("Race schedule saved with %d races.", len(schedule))
-    else:
-        logger.error("No valid races found to save.")
+        race["raceweek"] = raceweek
+        # Fall back to the stored URL, then to pairing by position as the calendar and index agree in order.
+        race["results"] = (results_by_name.get(name) or race.get("results")
+                           or (result_links[raceweek - 1] if raceweek <= len(result_links) else None))
+        schedule.append(race)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(schedule, f, default=str, indent=2)
+    os.replace(tmp, path)
+    logger.info("Race schedule saved with %d races.", len(schedule))
 
 if __name__ == "__main__":
+    configure_logging()
     populate_race_schedule()
\ No newline at end of file
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Sheets API quota handling.
+
+Every request the gspread client sends goes through QuotaHTTPClient, which takes a
+token from the shared read or write bucket first, so all threads and leagues together
+stay inside the per-minute quota. 429, 408 and 5xx responses (and dropped connections)
+are retried with exponential backoff and jitter; a 429 also pauses the bucket for
+every thread. Whatever still fails after SHEETS_RETRIES is raised to the caller.
+"""
+
+import random
+import threading
+import time
+from http import HTTPStatus
+from typing import Any, Optional
+
+import requests
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+from config import *
+from perf import PERF
+
+RETRY_STATUSES = {HTTPStatus.REQUEST_TIMEOUT, HTTPStatus.TOO_MANY_REQUESTS}
+
+# What a Sheets call raises once its retries are used up; callers must not swallow these.
+SHEETS_ERRORS = (APIError, requests.exceptions.RequestException)
+
+
+class TokenBucket:
+    """
+    Token bucket holding at most `burst` requests, refilled so that no quota window
+    can carry more than `per_minute` requests.
+
+    Attributes:
+        per_minute (int): The quota the bucket is sized to.
+        burst (int): Requests that may be sent back to back.
+        period (float): Length of the quota window in seconds.
+    """
+
+    def __init__(self, per_minute: int, burst: int, period: float = 60.0) -> None:
+        self.per_minute = per_minute
+        self.burst = min(burst, per_minute)
+        self.period = period
+        # A full bucket plus a window of refill must fit in one quota window.
+        self.rate = max(per_minute - self.burst, 1) / period
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"TokenBucket(per_minute={self.per_minute}, burst={self.burst})"
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for `seconds` and empty the bucket (after the API reports throttling)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class SheetsQuota:
+    """
+    The read and write buckets shared by every Sheets client in the process.
+
+    Attributes:
+        reads (TokenBucket): GET requests.
+        writes (TokenBucket): Every other method.
+    """
+
+    def __init__(self, reads_per_minute: int = SHEETS_READS_PER_MINUTE,
+                 writes_per_minute: int = SHEETS_WRITES_PER_MINUTE, burst: int = SHEETS_BURST,
+                 period: float = 60.0) -> None:
+        self.reads = TokenBucket(reads_per_minute, burst, period)
+        self.writes = TokenBucket(writes_per_minute, burst, period)
+
+    def __repr__(self) -> str:
+        return f"SheetsQuota(reads={self.reads}, writes={self.writes})"
+
+    def bucket(self, method: str) -> TokenBucket:
+        return self.reads if method.upper() == "GET" else self.writes
+
+
+# Process-wide quota shared by every league and thread.
+SHEETS_QUOTA = SheetsQuota()
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Seconds to wait before retry number `attempt` (from 0): the server's Retry-After, else jittered exponential."""
+    if retry_after:
+        try:
+            return min(float(retry_after), SHEETS_BACKOFF_MAX)
+        except ValueError:
+            pass
+    delay = min(SHEETS_BACKOFF_BASE * 2 ** attempt, SHEETS_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def retryable(e: Exception) -> bool:
+    """Return True for failures worth retrying: throttling, timeouts, server errors and dropped connections."""
+    if isinstance(e, APIError):
+        return e.code in RETRY_STATUSES or e.code >= HTTPStatus.INTERNAL_SERVER_ERROR
+    return isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class QuotaHTTPClient(HTTPClient):
+    """gspread HTTP client that rate limits every request against SHEETS_QUOTA and retries transient failures."""
+
+    quota = SHEETS_QUOTA
+    retries = SHEETS_RETRIES
+
+    def request(self, method: str, endpoint: str, *args: Any, **kwargs: Any) -> requests.Response:
+        bucket = self.quota.bucket(method)
+        attempt = 0
+        while True:
+            PERF.count("sheets_wait_seconds", bucket.acquire())
+            try:
+                return super().request(method, endpoint, *args, **kwargs)
+            except SHEETS_ERRORS as e:
+                if not retryable(e) or attempt == self.retries:
+                    raise
+                response = getattr(e, "response", None)
+                delay = backoff_delay(attempt, response.headers.get("Retry-After") if response is not None else None)
+                if isinstance(e, APIError) and e.code == HTTPStatus.TOO_MANY_REQUESTS:
+                    bucket.pause(delay)
+                PERF.count("sheets_retries")
+                logger.warning("Sheets %s %s failed (%s); retry %d/%d in %.1fs",
+                               method, endpoint, e, attempt + 1, self.retries, delay)
+                time.sleep(delay)
+                attempt += 1
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+On-disk columnar store of parsed result tables.
+
+Each page's parsed table is saved as one numpy structured array (.npy, one field per
+column), named by the URL and a hash of the HTML it was parsed from, with a JSON
+sidecar per URL naming the current array and its columns. Tables are loaded memory-mapped: numeric columns are read straight
+from the mapping and only text columns become Python strings, so no page is parsed twice.
+
+An entry is served for a page whose HTML hashes the same, or, once the page is final
+(see HTTPCache.is_final), without fetching the HTML at all. A hash hit on a page that
+turned final since it was stored refreshes the entry's stored_at, so it is served as
+final from then on; other hits leave the entry untouched.
+Loaded tables share the mapping: their numeric columns are read-only.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import *
+from perf import PERF
+
+STORE_VERSION = 1
+
+
+def content_hash(html: bytes) -> str:
+    return hashlib.sha1(html).hexdigest()
+
+
+def to_records(df: pd.DataFrame) -> Tuple[np.ndarray, List[dict]]:
+    """
+    Encode a DataFrame as a structured array and its column descriptions.
+
+    Numeric and bool columns keep their dtype. Text columns become fixed-width unicode
+    fields, with a bool field beside them marking missing cells when there are any.
+    """
+    fields, columns = [], []
+    for i, name in enumerate(df.columns):
+        values = df.iloc[:, i]
+        column = {"name": str(name), "field": f"c{i}"}
+        if values.dtype.kind in "biuf":
+            fields.append((column["field"], values.to_numpy()))
+        else:
+            missing = values.isna().to_numpy()
+            fields.append((column["field"], np.array(values.where(~missing, "").astype(str).to_numpy(), dtype=str)))
+            column["text"] = True
+            if missing.any():
+                column["missing"] = f"m{i}"
+                fields.append((column["missing"], missing))
+        columns.append(column)
+    records = np.empty(len(df), dtype=[(field, values.dtype) for field, values in fields])
+    for field, values in fields:
+        records[field] = values
+    return records, columns
+
+
+def from_records(records: np.ndarray, columns: List[dict]) -> pd.DataFrame:
+    """Rebuild the DataFrame encoded by to_records."""
+    data = {}
+    for column in columns:
+        values = np.asarray(records[column["field"]])  # a view of the mapping, not a copy
+        if column.get("text"):
+            values = values.astype(object)
+            if "missing" in column:
+                values[records[column["missing"]]] = np.nan
+        data[column["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+class TableStore:
+    """
+    Parsed tables on disk, one entry per URL.
+
+    Attributes:
+        directory (str): Where entries are stored.
+        final_after (Callable): Maps a URL to the datetime after which its content no longer changes, or None.
+    """
+
+    def __init__(self, directory: str = TABLE_STORE_DIR,
+                 final_after: Optional[Callable[[str], Optional[datetime]]] = None) -> None:
+        self.directory = directory
+        self.final_after = final_after
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f"TableStore(directory={self.directory!r})"
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest() + ".json")
+
+    def _array_path(self, meta: dict) -> str:
+        """Arrays are keyed by URL and content hash, so a sidecar always names the array it describes."""
+        return os.path.join(self.directory, f"{hashlib.sha1(meta['url'].encode()).hexdigest()}-{meta['hash']}.npy")
+
+    def _meta(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._meta_path(url)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("version") == STORE_VERSION and meta.get("url") == url else None
+
+    def _load(self, url: str, meta: dict) -> Optional[pd.DataFrame]:
+        try:
+            records = np.load(self._array_path(meta), mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning("Unable to load stored table for %s: %s", url, e)
+            return None
+        PERF.count("table_store_hits")
+        return from_records(records, meta["columns"])
+
+    def _write(self, path: str, write: Callable) -> None:
+        """Atomically replace a file with what write(f) writes to it."""
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+
+    def _write_meta(self, url: str, meta: dict) -> None:
+        self._write(self._meta_path(url), lambda f: f.write(json.dumps(meta).encode()))
+
+    def get(self, url: str, html: bytes) -> Optional[pd.DataFrame]:
+        """Return the stored table for a page if it was parsed from the same HTML, or None."""
+        meta = self._meta(url)
+        if meta is None or meta["hash"] != content_hash(html):
+            return None
+        df = self._load(url, meta)
+        if df is not None and self._became_final(url, meta):
+            # The HTML is still current now that the page is final, so get_final can serve it from here on.
+            self._write_meta(url, {**meta, "stored_at": time.time()})
+        return df
+
+    def _became_final(self, url: str, meta: dict) -> bool:
+        """Return True if a page has turned final since its entry was stored, so its stored_at needs moving on."""
+        final_after = self.final_after(url) if self.final_after else None
+        return bool(final_after) and meta["stored_at"] <= final_after.timestamp() <= time.time() # type: ignore
+
+    def get_final(self, url: str) -> Optional[pd.DataFrame]:
+        """Return the stored table for a page that can no longer change, or None (without needing its HTML)."""
+        final_after = self.final_after(url) if self.final_after else None
+        if not final_after:
+            return None
+        meta = self._meta(url)
+        if meta is None or meta["stored_at"] <= final_after.timestamp():
+            return None
+        return self._load(url, meta)
+
+    def put(self, url: str, html: bytes, df: pd.DataFrame) -> None:
+        """Store a page's parsed table, replacing any earlier entry for the URL."""
+        if df.empty:
+            return
+        try:
+            records, columns = to_records(df)
+        except (TypeError, ValueError) as e:
+            logger.warning("Unable to store table for %s: %s", url, e)
+            return
+        previous = self._meta(url)
+        meta = {"version": STORE_VERSION, "url": url, "hash": content_hash(html),
+                "columns": columns, "stored_at": time.time()}
+        # Write the array before the sidecar that points to it, then drop the array it replaced.
+        self._write(self._array_path(meta), lambda f: np.save(f, records, allow_pickle=False))
+        self._write_meta(url, meta)
+        if previous and previous["hash"] != meta["hash"]:
+            try:
+                os.remove(self._array_path(previous))
+            except OSError:
+                pass
+
+
+# Process-wide store; scraping_utils sets final_after from the schedule.
+TABLE_STORE = TableStore()
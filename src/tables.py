@@ -1,10 +1,20 @@
+import re
+import threading
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass, field
 from typing import List, Tuple, Optional, Callable, Any
-from gspread_dataframe import get_as_dataframe, set_with_dataframe
+from numbers import Real
+from gspread import Cell
+from gspread.utils import (ValueRenderOption, ValueInputOption, DateTimeOption,
+                           a1_range_to_grid_range, a1_to_rowcol, rowcol_to_a1)
+from pandas.io.parsers import TextParser
 
 
 from config import *
+from registry import REGISTRY, MISSING
+from perf import PERF
+from sheets_quota import SHEETS_ERRORS
 ### Coordinate Classes ###
 @dataclass(frozen=True) #TODO repr method? so can print logged errors?
 class TableCoords:
@@ -27,7 +37,7 @@ class TableCoords:
     #Optional fields
     name: Optional[str] = field(default=None)
     key_column: Optional[str] = field(default=None)
-    #Field for driver standings string slicing [-3]
+    #Maps raw key cells to display names (e.g. REGISTRY.name)
     key_transform: Optional[Callable[[Any], Any]] = field(default=None)
     drop_cols: Optional[List[str]] = field(default=None)
     # wildcard fields
@@ -59,8 +69,24 @@ class TableCoords:
             CellCoords: The new cell coordinates.
         """
         return CellCoords(self.row + row_offset, self.column + col_offset)
+
+    def a1_range(self) -> str:
+        """Return the A1 range covering this table's header row and data rows."""
+        top_left = rowcol_to_a1(self.header + 1, min(self.width) + 1)
+        bottom_right = rowcol_to_a1(self.header + 1 + self.length, max(self.width) + 1)
+        return f"{top_left}:{bottom_right}"
     
     ## Getting and Setting
+
+    def _read_frame(self, sheet) -> pd.DataFrame:
+        """Read this table from a worksheet, or cut it from a SheetSnapshot's grid."""
+        if isinstance(sheet, SheetSnapshot):
+            return sheet.get_as_dataframe(header=self.header, usecols=self.width, nrows=self.length)
+        # Reads through worksheet.spreadsheet, which CountingWorksheet does not see.
+        PERF.count("sheets_reads")
+        # Only the live-worksheet path needs gspread_dataframe; updates read through a SheetSnapshot.
+        from gspread_dataframe import get_as_dataframe
+        return get_as_dataframe(sheet, header=self.header, usecols=self.width, nrows=self.length)
     
     def get_table(self, sheet) -> pd.DataFrame:
         """
@@ -70,13 +96,19 @@ class TableCoords:
             sheet: The spreadsheet object to retrieve the data from.
         
         Returns:
-            pd.DataFrame: The extracted table. If an error occurs, an empty DataFrame is returned.
+            pd.DataFrame: The extracted table. If it cannot be parsed, an empty DataFrame is returned.
+
+        Raises:
+            SHEETS_ERRORS: If the Sheets API request still fails after its retries.
         """
         try:
-            table = get_as_dataframe(sheet, header=self.header, usecols=self.width, nrows=self.length)
+            table = self._read_frame(sheet)
             return table  # type: ignore
+        except SHEETS_ERRORS as e:
+            logger.error("Unable to read %r: %s", self, e)
+            raise
         except Exception as e:
-            logging.info("unable to retrieve table: %s", e)
+            logger.warning("unable to retrieve table: %s", e)
             return pd.DataFrame()
         
     def get_dict(self, sheet) -> dict:
@@ -92,15 +124,19 @@ class TableCoords:
 
         Raises:
             ValueError: If key_column is not set.
+            SHEETS_ERRORS: If the Sheets API request still fails after its retries.
         """
         if not self.key_column:
             raise ValueError("No key_column specified for this TableCoords instance.")
 
         try:
             # Retrieve the table from the sheet.
-            df = get_as_dataframe(sheet, header=self.header, usecols=self.width, nrows=self.length)
+            df = self._read_frame(sheet)
+        except SHEETS_ERRORS as e:
+            logger.error("Unable to read %r: %s", self, e)
+            raise
         except Exception as e:
-            logging.info("Unable to retrieve table: %s", e)
+            logger.warning("Unable to retrieve table: %s", e)
             return {}
 
         if df.empty:
@@ -110,17 +146,51 @@ class TableCoords:
         # Vectorized transformation of the key column.
         keys = df[self.key_column].apply(self.key_transform) if self.key_transform else df[self.key_column]
         return dict(zip(keys, df.index))
+
+    def get_positions(self, sheet) -> np.ndarray:
+        """
+        Return each driver/team's row in this table as an array indexed by registry ID.
+
+        Args:
+            sheet: The spreadsheet object (or SheetSnapshot) to read from.
+
+        Returns:
+            np.ndarray: Row position per ID, MISSING for anyone not in the table.
+
+        Raises:
+            SHEETS_ERRORS: If the Sheets API request still fails after its retries.
+        """
+        positions = np.full(len(REGISTRY), MISSING, dtype=np.int64)
+        try:
+            df = self._read_frame(sheet)
+            ids = REGISTRY.resolve_many(df[self.key_column])
+        except SHEETS_ERRORS as e:
+            logger.error("Unable to read %r: %s", self, e)
+            raise
+        except Exception as e:
+            logger.warning("Unable to retrieve table: %s", e)
+            return positions
+        known = ids != MISSING
+        positions[ids[known]] = df.index.to_numpy()[known]
+        return positions
     
     def set_table(self, sheet, updated_table: pd.DataFrame, WC: bool = False) -> None:
         """
         Places an updated table onto the provided sheet using this instance's coordinates.
         
         Args:
-            sheet: The spreadsheet object where the table will be placed.
+            sheet: The spreadsheet object (or SheetSnapshot) where the table will be placed.
             updated_table (pd.DataFrame): The updated table to place on the sheet.
             WC (bool): Flag to include index or any other parameter (default is False).
+
+        Raises:
+            Exception: Any failure to place the table, after logging it, so a stale table is never silent.
         """
         try:
+            if isinstance(sheet, SheetSnapshot):
+                sheet.set_with_dataframe(updated_table, row=self.row, col=self.column, include_index=WC)
+                return
+            from gspread_dataframe import set_with_dataframe
             set_with_dataframe(
                 worksheet=sheet,
                 dataframe=updated_table,
@@ -129,7 +199,8 @@ class TableCoords:
                 include_index=WC
             )
         except Exception as e:
-            logging.info("Unable to place updated table: %s", e)
+            logger.error("Unable to place updated table %r: %s", self, e)
+            raise
 
 
 @dataclass(frozen=False)
@@ -149,61 +220,374 @@ class CellCoords:
         return (self.row, self.column)
 
 
+### Worksheet Snapshot ###
+
+UNNAMED_COLUMN = re.compile(r"^Unnamed:\s\d+(?:_level_\d+)?$")
+
+
+def _cell_value(value: Any) -> Any:
+    """Convert a DataFrame value into the value a sheet cell would hold (as gspread_dataframe does)."""
+    if pd.isnull(value) is True:
+        return ""
+    if hasattr(value, "item"):  # numpy scalars
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, Real):
+        return value
+    return str(value)
+
+
+def same_value(old: Any, new: Any) -> bool:
+    """Return True if a cell holding old already shows new (numbers compare by value, the rest as text)."""
+    if isinstance(old, Real) and isinstance(new, Real):
+        return float(old) == float(new)
+    return str(old) == str(new)
+
+
+def frame_to_values(df: pd.DataFrame, include_index: bool = False) -> List[List[Any]]:
+    """Return the header row and data rows that set_with_dataframe would write for df."""
+    header = list(df.columns)
+    rows = df.to_numpy("object").tolist()
+    if include_index:
+        header = [df.index.name or ""] + header
+        rows = [[index] + row for index, row in zip(df.index, rows)]
+    return [[_cell_value(v) for v in row] for row in [header] + rows]
+
+
+class WritePlan:
+    """
+    Collects every cell write for a worksheet and sends them in one batch_update.
+
+    Writes are stored per cell, so a later write to a cell replaces an earlier one.
+    On flush, the cells are coalesced into the fewest rectangular ranges: contiguous
+    cells in a row form a run, and runs spanning the same columns on consecutive
+    rows are merged into one block.
+
+    Attributes:
+        worksheet: The gspread worksheet the writes are sent to.
+        saved (int): Total write requests avoided by batching, across all flushes.
+    """
+
+    def __init__(self, worksheet) -> None:
+        self.worksheet = worksheet
+        self.saved = 0
+        self._cells: dict = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def add(self, row: int, col: int, values: List[List[Any]],
+            keep: Optional[Callable[[int, int, Any], bool]] = None) -> int:
+        """
+        Queue a block of values with its top-left cell at 1-based (row, col).
+
+        Args:
+            row (int): Top row of the block.
+            col (int): Left column of the block.
+            values (List[List[Any]]): Rows of cell values.
+            keep (Callable): Optional filter (row, col, value) -> bool; cells it rejects are not queued.
+
+        Returns:
+            int: The number of cells queued.
+        """
+        queued = 0
+        with self._lock:
+            for r, row_values in enumerate(values, start=row):
+                for c, value in enumerate(row_values, start=col):
+                    if keep is None or keep(r, c, value):
+                        self._cells[(r, c)] = value
+                        queued += 1
+            if queued:
+                self._writes += 1
+        return queued
+
+    def ranges(self) -> List[dict]:
+        """Coalesce the queued cells into batch_update range dicts."""
+        runs = []  # (row, first col, last col, values)
+        for row, col in sorted(self._cells):
+            if runs and runs[-1][0] == row and runs[-1][2] == col - 1:
+                runs[-1][2] = col
+                runs[-1][3].append(self._cells[(row, col)])
+            else:
+                runs.append([row, col, col, [self._cells[(row, col)]]])
+
+        blocks = []  # (first row, last row, first col, last col, rows of values)
+        open_blocks = {}
+        for row, first, last, values in runs:
+            block = open_blocks.get((first, last))
+            if block and block[1] == row - 1:
+                block[1] = row
+                block[4].append(values)
+            else:
+                block = [row, row, first, last, [values]]
+                open_blocks[(first, last)] = block
+                blocks.append(block)
+
+        return [{"range": f"{rowcol_to_a1(top, left)}:{rowcol_to_a1(bottom, right)}", "values": values}
+                for top, bottom, left, right, values in blocks]
+
+    def flush(self) -> int:
+        """
+        Send all queued writes as one batch_update request.
+
+        Returns:
+            int: The number of write requests saved compared to sending each write separately.
+        """
+        with self._lock:
+            if not self._cells:
+                return 0
+            data = self.ranges()
+            self.worksheet.batch_update(data, value_input_option=ValueInputOption.user_entered)
+            saved = self._writes - 1
+            logger.info("Write plan sent %d writes as %d ranges in 1 request (%d requests saved).",
+                        self._writes, len(data), saved)
+            self.saved += saved
+            self._cells.clear()
+            self._writes = 0
+        return saved
+
+
+class SheetSnapshot:
+    """
+    In-memory copy of the worksheet ranges an update run needs.
+
+    The ranges are fetched once with a single batched values request, rendered as
+    formulas (as get_as_dataframe reads them), and every TableCoords cuts its
+    DataFrame out of the grid instead of downloading the whole worksheet.
+    Writes made through the snapshot are compared with the grid, only cells whose
+    value differs are queued on its WritePlan, and the block is applied to the grid,
+    so reads later in the run see the run's own changes and a run that changes
+    nothing sends no writes. Cells outside
+    the fetched ranges, or holding formulas, are read live since their computed
+    value is not known; pending writes are flushed first so the live read is current.
+
+    Attributes:
+        worksheet: The gspread worksheet the snapshot was taken from.
+        grid (List[List[Any]]): Cell values, 0-indexed from A1.
+        plan (WritePlan): Writes queued during the run, sent by flush().
+        changed (int): Cells queued because they differ from the sheet.
+        unchanged (int): Cells skipped because the sheet already holds them.
+    """
+
+    def __init__(self, worksheet, tables: List[TableCoords], cells: Optional[List[str]] = None) -> None:
+        self.worksheet = worksheet
+        self.plan = WritePlan(worksheet)
+        self.changed = 0
+        self.unchanged = 0
+        self._lock = threading.RLock()
+        ranges = [table.a1_range() for table in tables] + list(cells or [])
+        self._bounds = [a1_range_to_grid_range(r) for r in ranges]
+        self.grid: List[List[Any]] = []
+        fetched = worksheet.batch_get(ranges,
+                                      value_render_option=ValueRenderOption.formula,
+                                      date_time_render_option=DateTimeOption.formatted_string)
+        for bounds, values in zip(self._bounds, fetched):
+            self._paste(bounds["startRowIndex"], bounds.get("startColumnIndex", 0), values)
+        logger.info("Snapshot of %d ranges taken from %s", len(ranges), worksheet.title)
+
+    def __repr__(self) -> str:
+        return f"SheetSnapshot(worksheet={self.worksheet.title!r}, ranges={len(self._bounds)})"
+
+    def _paste(self, row: int, col: int, values: List[List[Any]]) -> None:
+        """Write a block of values into the grid at 0-based (row, col), growing it as needed."""
+        with self._lock:
+            width = max((col + len(r) for r in values), default=0)
+            for r in range(len(self.grid), row + len(values)):
+                self.grid.append([])
+            for r, row_values in enumerate(values, start=row):
+                line = self.grid[r]
+                if len(line) < width:
+                    line.extend([""] * (width - len(line)))
+                line[col:col + len(row_values)] = row_values
+
+    def _covers(self, row: int, col: int) -> bool:
+        """Return True if the 1-based (row, col) cell was part of the fetched ranges."""
+        # Whole-row ranges ("1:80") have no column bounds.
+        return any(b["startRowIndex"] < row <= b["endRowIndex"]
+                   and b.get("startColumnIndex", 0) < col <= b.get("endColumnIndex", col) for b in self._bounds)
+
+    ## Reading
+
+    def get_as_dataframe(self, header: int, usecols: List[int], nrows: int) -> pd.DataFrame:
+        """Parse a table from the grid exactly as gspread_dataframe.get_as_dataframe would."""
+        width = max(usecols) + 1
+        with self._lock:
+            values = [line + [""] * (width - len(line)) for line in self.grid[:header + nrows + 1]]
+        df = TextParser(values, header=header, usecols=usecols, nrows=nrows).read(nrows)
+        df = df.dropna(how="all", axis=0)
+        empty = [c for c in df.columns if isinstance(c, str) and UNNAMED_COLUMN.search(c) and df[c].isna().all()]
+        return df.drop(labels=empty, axis=1)
+
+    def cell(self, row: int, col: int) -> Cell:
+        """Return a cell from the snapshot, falling back to a live read for formulas or unfetched cells."""
+        with self._lock:
+            line = self.grid[row - 1] if row <= len(self.grid) else []
+            value = line[col - 1] if col <= len(line) else ""
+        if not self._covers(row, col) or (isinstance(value, str) and value.startswith("=")):
+            self.plan.flush()
+            return self.worksheet.cell(row, col)
+        return Cell(row, col, str(value))
+
+    def acell(self, label: str) -> Cell:
+        return self.cell(*a1_to_rowcol(label))
+
+    ## Writing (queued on the plan and applied to the grid)
+
+    def _changed(self, row: int, col: int, value: Any) -> bool:
+        """Return True unless the snapshot shows the 1-based (row, col) cell already holding value."""
+        if not self._covers(row, col):
+            return True
+        line = self.grid[row - 1] if row <= len(self.grid) else []
+        return not same_value(line[col - 1] if col <= len(line) else "", value)
+
+    def _write(self, row: int, col: int, values: List[List[Any]]) -> None:
+        """Queue the cells of a block that differ from the snapshot, then apply the block to the grid."""
+        with self._lock:
+            queued = self.plan.add(row, col, values, keep=self._changed)
+            self.changed += queued
+            self.unchanged += sum(len(r) for r in values) - queued
+            self._paste(row - 1, col - 1, values)
+
+    def set_with_dataframe(self, dataframe: pd.DataFrame, row: int, col: int, include_index: bool = False) -> None:
+        self._write(row, col, frame_to_values(dataframe, include_index))
+
+    def update_cell(self, row: int, col: int, value: Any) -> None:
+        self._write(row, col, [[_cell_value(value)]])
+
+    def update_acell(self, label: str, value: Any) -> None:
+        self.update_cell(*a1_to_rowcol(label), value)
+
+    def flush(self) -> int:
+        """Send the run's queued writes in one request. Returns the number of requests saved."""
+        logger.info("%d cells changed, %d unchanged cells not rewritten.", self.changed, self.unchanged)
+        return self.plan.flush()
+
+
 ### Sheet Coordinate Definitions ###
-SCOREBOARD = TableCoords(
-    name="Predictions Scoreboard",
-    header=12,
-    row=13,
-    column=2,
-    width=list(range(1, len(PLAYERS) * 2 + 1)),
-    length=30
-)
-
-POINTS_TRACKER = TableCoords(
-    header=27,
-    row=28,
-    column=16,
-    length=24,
-    width=[16, 17, 18, 19]
-)
-
-WILDCARD_POINTS = TableCoords(
-    header=SCOREBOARD.row + SCOREBOARD.length,
-    row=SCOREBOARD.row + SCOREBOARD.length + 1,
-    column=SCOREBOARD.column - 1,
-    width=list(range(len(PLAYERS) * 2 + 1)),
-    length=5
-)
-
-PLAYERS_POINTS = [
-    CellCoords(WILDCARD_POINTS.row + WILDCARD_POINTS.length + 1, SCOREBOARD.column + i * 2 + 1)
-    for i in range(len(PLAYERS))
-]
+# Run log cells: B1 last update, B2 current raceweek, B3/B4 next race name and date.
+LOG_CELLS = "B1:B4"
 
-WDC = TableCoords(
-    name="WDC Standings",
-    header=SCOREBOARD.header,
-    row=SCOREBOARD.row,
-    column=SCOREBOARD.width[-1] + 4,
-    width=list(range(SCOREBOARD.width[-1] + 3, SCOREBOARD.width[-1] + 4)),
-    length=TOT_DRIVERS,
-    drop_cols=["Nationality", "Car", "Pos"],
-    key_column="Driver",
-    key_transform= lambda name: NAME_CONVERSION.get(str(name)[-3:])
-)
-
-WCC = TableCoords(
-    name="WCC Standings",
-    header=WDC.row + TOT_DRIVERS,
-    row=WDC.row + TOT_DRIVERS + 1,
-    column=WDC.column,
-    width=WDC.width,
-    length=TOT_TEAMS,
-    drop_cols=["Pos"],
-    key_column="Team",
-    key_transform= lambda name: NAME_CONVERSION.get(str(name))
-    
-)
+@dataclass(frozen=True)
+class SheetLayout:
+    """
+    The tables whose width or position depends on the number of players.
+
+    Each player has a (prediction, score) column pair on the scoreboard and the
+    wildcard points table, a total cell below them and a points tracker column;
+    the standings sit to the right of the scoreboard.
+
+    Attributes:
+        players (int): The number of players the layout is sized for.
+    """
+    players: int
+    scoreboard: TableCoords
+    points_tracker: TableCoords
+    wildcard_points: TableCoords
+    players_points: List[CellCoords]
+    wdc: TableCoords
+    wcc: TableCoords
+    standings: TableCoords
+
+
+def sheet_layout(players: int) -> SheetLayout:
+    """Return the coordinates of the player-dependent tables for a sheet with the given number of players."""
+    scoreboard = TableCoords(
+        name="Predictions Scoreboard",
+        header=12,
+        row=13,
+        column=2,
+        width=list(range(1, players * 2 + 1)),
+        length=30
+    )
+
+    points_tracker = TableCoords(
+        header=27,
+        row=28,
+        column=16,
+        length=24,
+        width=list(range(16, 16 + players))
+    )
+
+    wildcard_points = TableCoords(
+        header=scoreboard.row + scoreboard.length,
+        row=scoreboard.row + scoreboard.length + 1,
+        column=scoreboard.column - 1,
+        width=list(range(players * 2 + 1)),
+        length=5
+    )
+
+    players_points = [
+        CellCoords(wildcard_points.row + wildcard_points.length + 1, scoreboard.column + i * 2 + 1)
+        for i in range(players)
+    ]
+
+    wdc = TableCoords(
+        name="WDC Standings",
+        header=scoreboard.header,
+        row=scoreboard.row,
+        column=scoreboard.width[-1] + 4,
+        width=list(range(scoreboard.width[-1] + 3, scoreboard.width[-1] + 4)),
+        length=TOT_DRIVERS,
+        drop_cols=["Nationality", "Car", "Pos"],
+        key_column="Driver",
+        key_transform=REGISTRY.name
+    )
+
+    wcc = TableCoords(
+        name="WCC Standings",
+        header=wdc.row + TOT_DRIVERS,
+        row=wdc.row + TOT_DRIVERS + 1,
+        column=wdc.column,
+        width=wdc.width,
+        length=TOT_TEAMS,
+        drop_cols=["Pos"],
+        key_column="Team",
+        key_transform=REGISTRY.name
+    )
+
+    # Both standings tables as written: the key column plus the scraped points column.
+    standings = TableCoords(
+        header=wdc.header,
+        row=wdc.row,
+        column=wdc.column,
+        width=[wdc.width[0], wdc.width[0] + 1],
+        length=TOT_DRIVERS + 1 + TOT_TEAMS
+    )
+
+    return SheetLayout(players, scoreboard, points_tracker, wildcard_points, players_points, wdc, wcc, standings)
+
+
+# The layout for the configured PLAYERS; update runs size theirs from the sheet with read_layout.
+LAYOUT = sheet_layout(len(PLAYERS))
+SCOREBOARD, POINTS_TRACKER, WILDCARD_POINTS = LAYOUT.scoreboard, LAYOUT.points_tracker, LAYOUT.wildcard_points
+PLAYERS_POINTS, WDC, WCC, STANDINGS = LAYOUT.players_points, LAYOUT.wdc, LAYOUT.wcc, LAYOUT.standings
+
+
+def read_layout(sheet) -> SheetLayout:
+    """
+    Return the layout of a worksheet, sized from the players named on its scoreboard header.
+
+    Players are counted in column pairs from SCOREBOARD.column up to the first pair with
+    a blank name (the gap before the standings). A sheet naming no players gets LAYOUT.
+
+    Args:
+        sheet: The worksheet or SheetSnapshot to read the header from.
+
+    Returns:
+        SheetLayout: The layout for the sheet's players.
+    """
+    header, players = SCOREBOARD.header + 1, 0
+    while sheet.cell(header, SCOREBOARD.column + players * 2).value:
+        players += 1
+    if not players:
+        logger.warning("No players named on the scoreboard header; using the %d configured players.", LAYOUT.players)
+        return LAYOUT
+    if players != LAYOUT.players:
+        logger.info("%d players on the sheet (%d configured).", players, LAYOUT.players)
+    return sheet_layout(players)
 
 ## Wildcards ##
 
@@ -231,4 +615,9 @@ wild_coord_table = {
 }
 
 POLES, PODIUMS, FLS, DNFS = (wild_coord_table[k] for k in ("Pole positions", "Podiums", "Fastest Laps", "DNFs"))
+WILDCARD_TABLES = {table.wildcard_index: table for table in wild_coord_table.values()}
 
+# Whole rows down to the last table, so an update run's snapshot covers every table
+# (and the tracker columns) however many players the sheet has.
+SNAPSHOT_ROWS = "1:{}".format(max(table.header + 1 + table.length for table in
+                                  [SCOREBOARD, WCC, POINTS_TRACKER, WILDCARD_POINTS, *wild_coord_table.values()]))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Dependency-aware task runner for the predictions update.
+
+Each task names the tasks (or seeded inputs) it needs. A task starts as soon as all
+of its inputs are ready, on a bounded thread pool, and receives their results as
+keyword arguments. A task is skipped if a required input failed; an optional input
+that failed is passed as None. The wall time of every task is recorded.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from config import *
+from perf import PERF
+
+
+@dataclass(frozen=True)
+class Task:
+    """
+    A unit of work in a TaskGraph.
+
+    Attributes:
+        name (str): Unique task name; its result is passed to dependents under this name.
+        func (Callable): Called with one keyword argument per dependency.
+        deps (List[str]): Names of the tasks or inputs this task needs.
+        optional (List[str]): Names of tasks or inputs it waits for, receiving None if they failed.
+    """
+    name: str
+    func: Callable[..., Any]
+    deps: List[str] = field(default_factory=list)
+    optional: List[str] = field(default_factory=list)
+
+    @property
+    def inputs(self) -> List[str]:
+        return self.deps + self.optional
+
+
+class TaskGraph:
+    """
+    A set of tasks with declared dependencies, run with bounded concurrency.
+
+    Attributes:
+        max_workers (int): Maximum tasks running at once.
+        timings (Dict[str, float]): Seconds each finished task took, in completion order.
+        failed (List[str]): Tasks that raised, were skipped because an input failed, or
+            inputs passed in as failed.
+    """
+
+    def __init__(self, max_workers: int = TASK_WORKERS) -> None:
+        self.max_workers = max_workers
+        self.tasks: Dict[str, Task] = {}
+        self.timings: Dict[str, float] = {}
+        self.failed: List[str] = []
+
+    def __repr__(self) -> str:
+        return f"TaskGraph(tasks={list(self.tasks)}, max_workers={self.max_workers})"
+
+    def add(self, name: str, func: Callable[..., Any], deps: Optional[List[str]] = None,
+            optional: Optional[List[str]] = None) -> None:
+        """Add a task called with the results of deps and optional (None where failed) as keyword arguments."""
+        if name in self.tasks:
+            raise ValueError(f"Task {name!r} is already in the graph.")
+        self.tasks[name] = Task(name, func, list(deps or []), list(optional or []))
+
+    def _check(self, inputs: Dict[str, Any], failed: List[str]) -> None:
+        """Raise ValueError for unknown dependencies or dependency cycles."""
+        for task in self.tasks.values():
+            unknown = [d for d in task.inputs if d not in self.tasks and d not in inputs and d not in failed]
+            if unknown:
+                raise ValueError(f"Task {task.name!r} depends on unknown {unknown}.")
+        resolved = set(inputs) | set(failed)
+        pending = dict(self.tasks)
+        while pending:
+            ready = [n for n, t in pending.items() if set(t.inputs) <= resolved]
+            if not ready:
+                raise ValueError(f"Dependency cycle between tasks {sorted(pending)}.")
+            resolved.update(ready)
+            for n in ready:
+                del pending[n]
+
+    def _timed(self, task: Task, kwargs: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return task.func(**kwargs)
+        finally:
+            self.timings[task.name] = time.perf_counter() - start
+            PERF.add_time(f"task.{task.name}", self.timings[task.name])
+
+    def run(self, inputs: Optional[Dict[str, Any]] = None, failed: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Run every task once its dependencies are done.
+
+        Args:
+            inputs (dict): Values available to tasks by name before anything runs.
+            failed (list): Input names that could not be produced (e.g. failed tasks of an
+                earlier graph); tasks depending on them are skipped.
+
+        Returns:
+            Dict[str, Any]: The inputs plus each successful task's result.
+        """
+        results: Dict[str, Any] = dict(inputs or {})
+        self.failed.extend(failed or [])
+        self._check(results, self.failed)
+        waiting = dict(self.tasks)
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while waiting or running:
+                for name, task in list(waiting.items()):
+                    if any(d in self.failed for d in task.deps):
+                        logger.error("Skipping task %s: an input failed.", name)
+                        self.failed.append(name)
+                        del waiting[name]
+                    elif all(d in results or d in self.failed for d in task.inputs):
+                        kwargs = {d: results.get(d) for d in task.inputs}
+                        running[executor.submit(self._timed, task, kwargs)] = name
+                        del waiting[name]
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error("Task %s failed: %s", name, e)
+                        self.failed.append(name)
+
+        logger.info("Task timings: %s", ", ".join(f"{n} {t:.2f}s" for n, t in self.timings.items()))
+        return results
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Wildcard tallies checkpointed per race.
+
+Each round's wildcard contribution (DNFs, podiums, pole and fastest lap per driver)
+is kept in a local JSON checkpoint keyed by raceweek and results URL. An update only
+scrapes the rounds missing from the checkpoint, then rebuilds the season totals
+from the stored contributions, so late-season updates cost the same as early ones.
+"""
+
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+from config import *
+from gSheet_utils import results_final_after
+from registry import REGISTRY
+
+
+class WildcardCheckpoint:
+    """
+    Per-race wildcard contributions saved between runs.
+
+    An entry is reused while its results URL still matches the schedule and the
+    round's results are final; rounds that are not final yet are scraped again on
+    every run, and their entry is replaced.
+
+    Attributes:
+        path (str): The JSON checkpoint file.
+    """
+
+    def __init__(self, path: str = WILDCARD_CHECKPOINT) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._races: Dict[str, dict] = {}
+        try:
+            with open(path) as f:
+                self._races = json.load(f)
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            logger.warning("Ignoring unreadable wildcard checkpoint %s: %s", path, e)
+
+    def __repr__(self) -> str:
+        return f"WildcardCheckpoint(path={self.path!r}, races={len(self._races)})"
+
+    def _entry(self, race: dict) -> dict:
+        """Return the stored entry for a race, or {} if missing or scraped from a different URL."""
+        entry = self._races.get(str(race["raceweek"]), {})
+        return entry if entry.get("results") == race["results"] else {}
+
+    def pending(self, races: List[dict], *fields: str) -> List[dict]:
+        """Return the races whose given fields must be (re)scraped."""
+        return [race for race in races
+                if not set(fields) <= set(self._entry(race).get("final", []))]
+
+    def record(self, race: dict, **counts: np.ndarray) -> None:
+        """Store a race's contribution for one or more fields, e.g. record(race, dnfs=REGISTRY.count(...))."""
+        # Stored by display name, so the checkpoint survives registry changes between runs.
+        counts = {field: REGISTRY.to_dict(values) for field, values in counts.items()} # type: ignore
+        final_after = results_final_after(race["results"])
+        final = bool(final_after) and final_after <= datetime.now(timezone.utc) # type: ignore
+        with self._lock:
+            entry = self._entry(race) or {"results": race["results"]}
+            entry.update(counts)
+            # Finality is tracked per field, since fields are recorded by separate updaters.
+            final_fields = set(entry.get("final", []))
+            final_fields = final_fields | set(counts) if final else final_fields - set(counts)
+            entry["final"] = sorted(final_fields)
+            self._races[str(race["raceweek"])] = entry
+
+    def recorded(self, race: dict, field: str) -> bool:
+        """Return True if the checkpoint holds a race's contribution for a field."""
+        return field in self._entry(race)
+
+    def matrix(self, races: List[dict], field: str) -> np.ndarray:
+        """Return a field's per-race counts as a (races x registry IDs) array, one row per race in order."""
+        return np.array([REGISTRY.from_dict(self._entry(race).get(field, {})) for race in races],
+                        dtype=np.int64).reshape(len(races), len(REGISTRY))
+
+    def totals(self, races: List[dict], field: str) -> np.ndarray:
+        """Sum a field's per-race counts over the given races, as an array indexed by registry ID."""
+        counts = np.zeros(len(REGISTRY), dtype=np.int64)
+        for race in races:
+            counts += REGISTRY.from_dict(self._entry(race).get(field, {}))
+        return counts
+
+    def save(self) -> None:
+        """Atomically write the checkpoint to disk."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self._races, f, indent=2)
+            os.replace(tmp, self.path)
+
+
+# Process-wide checkpoint shared by the wildcard updaters.
+CHECKPOINT = WildcardCheckpoint()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for the Google Sheets API.
+
+Implements the slice of the gspread worksheet surface the project uses (the
+get_as_dataframe/set_with_dataframe paths, acell/cell, update_cell/update_acell,
+batch_get/batch_update) on a plain grid, so update() can run end to end with no
+credentials. Every call that would be an HTTP request is counted as a read or a
+write and can be slowed down by a configurable latency, so API-call budgets can be
+asserted as regression checks.
+
+    client = league_client(LEAGUES, raceweek=3)
+    CLIENT.use(client)
+    update()
+    print(client.requests())
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from gspread import Cell
+from gspread.utils import (ValueRenderOption, a1_range_to_grid_range, a1_to_rowcol,
+                           rowcol_to_a1)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from config import *
+from tables import *
+
+# The scripts built on the fake sheet report through the log.
+configure_logging()
+
+NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+SUM_TERM = re.compile(r"^SUM\(([A-Z]+\d+):([A-Z]+\d+)\)$")
+
+
+def _user_entered(value: Any) -> Any:
+    """Store a written value the way Sheets does for USER_ENTERED input (numeric strings become numbers)."""
+    if isinstance(value, str) and NUMBER.match(value):
+        return float(value) if "." in value else int(value)
+    return value
+
+
+def _formatted(value: Any) -> str:
+    """Render a stored value as a FORMATTED_VALUE string."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class FakeWorksheet:
+    """
+    One worksheet held as a grid of stored values (numbers, strings or "=" formulas).
+
+    Formulas are stored as written and evaluated on formatted/unformatted reads;
+    only sums of ranges, cell references and numbers joined by "+" are understood,
+    anything else reads as "#NAME?".
+
+    Attributes:
+        title (str): The worksheet title.
+        latency (float): Seconds each request sleeps before answering.
+        reads (int): Read requests made so far.
+        writes (int): Write requests made so far.
+        calls (List[Tuple[str, Any]]): Each request as (method, detail), in order.
+    """
+
+    def __init__(self, title: str = "Sheet1", rows: int = 100, cols: int = 40,
+                 latency: float = 0.0, spreadsheet: Optional["FakeSpreadsheet"] = None) -> None:
+        self.title = title
+        self.latency = latency
+        self.spreadsheet = spreadsheet or FakeSpreadsheet("offline", [self])
+        self.grid: List[List[Any]] = [[""] * cols for _ in range(rows)]
+        self.reads = 0
+        self.writes = 0
+        self.calls: List[Tuple[str, Any]] = []
+        self._lock = threading.RLock()
+
+    def __repr__(self) -> str:
+        return f"FakeWorksheet(title={self.title!r}, reads={self.reads}, writes={self.writes})"
+
+    @property
+    def row_count(self) -> int:
+        return len(self.grid)
+
+    @property
+    def col_count(self) -> int:
+        return len(self.grid[0]) if self.grid else 0
+
+    ## Request accounting
+
+    def _request(self, kind: str, method: str, detail: Any = None) -> None:
+        """Count one API request and wait out the configured latency."""
+        with self._lock:
+            if kind == "read":
+                self.reads += 1
+            else:
+                self.writes += 1
+            self.calls.append((method, detail))
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.reads = self.writes = 0
+            self.calls.clear()
+
+    ## Grid access (no accounting)
+
+    def get_value(self, row: int, col: int) -> Any:
+        """Return the stored value at 1-based (row, col)."""
+        with self._lock:
+            if row > len(self.grid) or col > len(self.grid[row - 1]):
+                return ""
+            return self.grid[row - 1][col - 1]
+
+    def set_value(self, row: int, col: int, value: Any) -> None:
+        """Store a value at 1-based (row, col), growing the grid as needed."""
+        with self._lock:
+            while len(self.grid) < row:
+                self.grid.append([""] * self.col_count)
+            line = self.grid[row - 1]
+            if len(line) < col:
+                line.extend([""] * (col - len(line)))
+            line[col - 1] = _user_entered(value)
+
+    def evaluate(self, row: int, col: int) -> Any:
+        """Return the computed value of a cell."""
+        value = self.get_value(row, col)
+        if not (isinstance(value, str) and value.startswith("=")):
+            return value
+        total = 0.0
+        for term in value[1:].replace(" ", "").split("+"):
+            match = SUM_TERM.match(term.upper())
+            if match:
+                (top, left), (bottom, right) = a1_to_rowcol(match[1]), a1_to_rowcol(match[2])
+                cells = [(r, c) for r in range(top, bottom + 1) for c in range(left, right + 1)]
+            elif NUMBER.match(term):
+                total += float(term)
+                continue
+            else:
+                try:
+                    cells = [a1_to_rowcol(term)]
+                except Exception:
+                    return "#NAME?"
+            for r, c in cells:
+                cell = self.evaluate(r, c)
+                if isinstance(cell, (int, float)):
+                    total += cell
+        return int(total) if total.is_integer() else total
+
+    def _render(self, row: int, col: int, render: Optional[str]) -> Any:
+        if render == ValueRenderOption.formula:
+            return self.get_value(row, col)
+        if render == ValueRenderOption.unformatted:
+            return self.evaluate(row, col)
+        return _formatted(self.evaluate(row, col))
+
+    def _block(self, bounds: dict, render: Optional[str]) -> List[List[Any]]:
+        """Return a range's values trimmed of trailing blanks, as the values API does."""
+        top = bounds.get("startRowIndex", 0)
+        bottom = bounds.get("endRowIndex", self.row_count)
+        left = bounds.get("startColumnIndex", 0)
+        right = bounds.get("endColumnIndex", self.col_count)
+        block = [[self._render(r + 1, c + 1, render) for c in range(left, right)] for r in range(top, bottom)]
+        block = [row[:max((i + 1 for i, v in enumerate(row) if v != ""), default=0)] for row in block]
+        while block and not block[-1]:
+            block.pop()
+        return block
+
+    ## Reading
+
+    def batch_get(self, ranges: List[str], value_render_option: Optional[str] = None, **kwargs) -> List[List[List[Any]]]:
+        self._request("read", "batch_get", list(ranges))
+        return [self._block(a1_range_to_grid_range(r), value_render_option) for r in ranges]
+
+    def get(self, range_name: Optional[str] = None, value_render_option: Optional[str] = None, **kwargs) -> List[List[Any]]:
+        self._request("read", "get", range_name)
+        bounds = a1_range_to_grid_range(range_name) if range_name else {}
+        return self._block(bounds, value_render_option)
+
+    def get_all_values(self, value_render_option: Optional[str] = None, **kwargs) -> List[List[Any]]:
+        return self.get(value_render_option=value_render_option)
+
+    def cell(self, row: int, col: int, value_render_option: str = ValueRenderOption.formatted) -> Cell:
+        self._request("read", "cell", (row, col))
+        return Cell(row, col, self._render(row, col, value_render_option))
+
+    def acell(self, label: str, value_render_option: str = ValueRenderOption.formatted) -> Cell:
+        return self.cell(*a1_to_rowcol(label), value_render_option=value_render_option)
+
+    ## Writing
+
+    def _paste(self, label: str, values: List[List[Any]]) -> None:
+        top, left = a1_to_rowcol(label.split(":")[0])
+        for r, row in enumerate(values, start=top):
+            for c, value in enumerate(row, start=left):
+                self.set_value(r, c, value)
+
+    def batch_update(self, data: List[dict], value_input_option: Optional[str] = None, **kwargs) -> dict:
+        self._request("write", "batch_update", [d["range"] for d in data])
+        for d in data:
+            self._paste(d["range"], d["values"])
+        return {"totalUpdatedCells": sum(len(row) for d in data for row in d["values"])}
+
+    def update(self, values: List[List[Any]], range_name: str = "A1", **kwargs) -> dict:
+        self._request("write", "update", range_name)
+        self._paste(range_name, values)
+        return {"updatedRange": range_name}
+
+    def update_cells(self, cell_list: List[Cell], value_input_option: Optional[str] = None) -> dict:
+        self._request("write", "update_cells", len(cell_list))
+        for cell in cell_list:
+            self.set_value(cell.row, cell.col, cell.value)
+        return {"updatedCells": len(cell_list)}
+
+    def update_cell(self, row: int, col: int, value: Any) -> dict:
+        self._request("write", "update_cell", (row, col))
+        self.set_value(row, col, value)
+        return {"updatedCells": 1}
+
+    def update_acell(self, label: str, value: Any) -> dict:
+        return self.update_cell(*a1_to_rowcol(label), value)
+
+    def resize(self, rows: Optional[int] = None, cols: Optional[int] = None) -> None:
+        self._request("write", "resize", (rows, cols))
+        with self._lock:
+            if rows is not None:
+                self.grid = self.grid[:rows] + [[""] * self.col_count for _ in range(rows - len(self.grid))]
+            if cols is not None:
+                self.grid = [(line + [""] * cols)[:cols] for line in self.grid]
+
+
+class FakeSpreadsheet:
+    """
+    A spreadsheet of fake worksheets; values_get serves gspread_dataframe.get_as_dataframe.
+
+    Attributes:
+        id (str): The spreadsheet key.
+        worksheets (List[FakeWorksheet]): Worksheets by index.
+    """
+
+    def __init__(self, key: str, worksheets: Optional[List[FakeWorksheet]] = None) -> None:
+        self.id = key
+        self.worksheets = worksheets if worksheets is not None else []
+
+    def __repr__(self) -> str:
+        return f"FakeSpreadsheet(id={self.id!r}, worksheets={len(self.worksheets)})"
+
+    def get_worksheet(self, index: int) -> Optional[FakeWorksheet]:
+        return self.worksheets[index] if index < len(self.worksheets) else None
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        return next(ws for ws in self.worksheets if ws.title == title)
+
+    def values_get(self, range: str, params: Optional[dict] = None) -> dict:
+        title = range.strip("'").split("!")[0]
+        ws = self.worksheet(title) if any(w.title == title for w in self.worksheets) else self.worksheets[0]
+        render = (params or {}).get("valueRenderOption", ValueRenderOption.formatted)
+        ws._request("read", "values_get", range)
+        return {"values": ws._block({}, render)}
+
+
+class _FakeHTTPClient:
+    def login(self) -> None:
+        pass
+
+
+class FakeClient:
+    """
+    Stand-in for an authorized gspread.Client, serving fake spreadsheets by key.
+
+    Attributes:
+        spreadsheets (Dict[str, FakeSpreadsheet]): Spreadsheets by key.
+        opens (int): open_by_key requests made so far.
+    """
+
+    def __init__(self, spreadsheets: Dict[str, FakeSpreadsheet]) -> None:
+        self.spreadsheets = spreadsheets
+        self.opens = 0
+        self.expiry = datetime.now() + timedelta(days=365)
+        self.http_client = _FakeHTTPClient()
+
+    def __repr__(self) -> str:
+        return f"FakeClient(spreadsheets={list(self.spreadsheets)})"
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        self.opens += 1
+        return self.spreadsheets[key]
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        return [ws for sh in self.spreadsheets.values() for ws in sh.worksheets]
+
+    def requests(self) -> Dict[str, int]:
+        """Return the read and write requests made across every worksheet, plus spreadsheet opens."""
+        return {"reads": sum(ws.reads for ws in self.worksheets()),
+                "writes": sum(ws.writes for ws in self.worksheets()),
+                "opens": self.opens}
+
+
+## Seeding ##
+
+def seed_worksheet(ws: FakeWorksheet, raceweek: int = 0, seed: int = 0, players: List[str] = PLAYERS) -> FakeWorksheet:
+    """
+    Lay out a worksheet the way tables.py expects the predictions sheet.
+
+    Players get random driver/team predictions on the scoreboard and random wildcard
+    picks, the standings tables hold every driver and team, and each players_points
+    cell sums the player's scoreboard and wildcard score columns. Tables are placed by
+    sheet_layout for the number of players, as read_layout finds them.
+
+    Args:
+        ws (FakeWorksheet): The worksheet to fill.
+        raceweek (int): The raceweek stored in B2.
+        seed (int): Seed for the random predictions.
+        players (List[str]): Player names, one column pair each.
+
+    Returns:
+        FakeWorksheet: ws, for chaining.
+    """
+    rng = random.Random(seed)
+    drivers, teams = REGISTRY.drivers, REGISTRY.teams
+    codes = list(NAME_CONVERSION)[:TOT_DRIVERS]
+    layout = sheet_layout(len(players))
+
+    for label, value in zip(["B1", "B2", "B3", "B4"], ["", raceweek, "", ""]):
+        ws.set_value(*a1_to_rowcol(label), value)
+
+    header, first = SCOREBOARD.header + 1, SCOREBOARD.column
+    for k in range(SCOREBOARD.length):
+        ws.set_value(header + 1 + k, first - 1, k + 1)
+    for i, player in enumerate(players):
+        col = first + 2 * i
+        ws.set_value(header, col, player)
+        ws.set_value(header, col + 1, f"{player} score")
+        picks = rng.sample(drivers, PREDICTION_DRIVERS) + rng.sample(teams, len(teams))
+        for k, pick in enumerate(picks[:SCOREBOARD.length]):
+            ws.set_value(header + 1 + k, col, pick)
+            ws.set_value(header + 1 + k, col + 1, 0)
+
+    key_col = layout.wdc.width[0] + 1
+    ws.set_value(layout.wdc.header + 1, key_col, "Driver")
+    ws.set_value(layout.wdc.header + 1, key_col + 1, "Pts")
+    for k, code in enumerate(codes):
+        ws.set_value(layout.wdc.header + 2 + k, key_col, f"{NAME_CONVERSION[code]}{code}")
+        ws.set_value(layout.wdc.header + 2 + k, key_col + 1, 0)
+    ws.set_value(layout.wcc.header + 1, key_col, "Team")
+    ws.set_value(layout.wcc.header + 1, key_col + 1, "Pts")
+    for k, team in enumerate(list(NAME_CONVERSION)[TOT_DRIVERS:]):
+        ws.set_value(layout.wcc.header + 2 + k, key_col, team)
+        ws.set_value(layout.wcc.header + 2 + k, key_col + 1, 0)
+
+    wc_header = WILDCARD_POINTS.header + 1
+    ws.set_value(wc_header, 1, "Wildcards")
+    labels = [wildcard["name"] for wildcard in sorted(WILDCARDS, key=lambda w: w["index"])]
+    for k, label in enumerate((labels + ["Bonus"])[:WILDCARD_POINTS.length]):
+        ws.set_value(wc_header + 1 + k, 1, label)
+    for i, player in enumerate(players):
+        col = 2 + 2 * i
+        ws.set_value(wc_header, col, player)
+        ws.set_value(wc_header, col + 1, f"{player} score")
+        for k in range(WILDCARD_POINTS.length):
+            ws.set_value(wc_header + 1 + k, col, rng.choice(drivers))
+
+    for cell in layout.players_points:
+        scores = f"{rowcol_to_a1(header + 1, cell.column)}:{rowcol_to_a1(header + SCOREBOARD.length, cell.column)}"
+        wildcards = f"{rowcol_to_a1(wc_header + 1, cell.column)}:{rowcol_to_a1(wc_header + WILDCARD_POINTS.length, cell.column)}"
+        ws.set_value(cell.row, cell.column, f"=SUM({scores})+SUM({wildcards})")
+    return ws
+
+
+def league_client(leagues: Dict[str, Dict[int, str]] = LEAGUES, raceweek: int = 0,
+                  latency: float = 0.0, seed: int = 0) -> FakeClient:
+    """Return a client holding one seeded spreadsheet per league, with a worksheet per configured sheet."""
+    spreadsheets = {}
+    for n, (key, sheets) in enumerate(leagues.items()):
+        spreadsheet = FakeSpreadsheet(key)
+        for index in range(max(sheets) + 1):
+            ws = FakeWorksheet(sheets.get(index, f"Sheet{index + 1}"), latency=latency, spreadsheet=spreadsheet)
+            spreadsheet.worksheets.append(seed_worksheet(ws, raceweek=raceweek, seed=seed + n * 100 + index))
+        spreadsheets[key] = spreadsheet
+    return FakeClient(spreadsheets)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end run of predictions_updater.update().
+
+Every league worksheet is an in-memory fake (tests/fake_sheets.py) and every
+formula1.com page is served from tests/fixtures, so the whole update runs with no
+credentials or network. The run fails if a worksheet needs more Sheets API
+requests than its budget, so changes that add round trips show up here, or if
+an immediate rerun, with nothing new to write, sends any write. The sheet starts at
+raceweek RACES with an empty points tracker, so the earlier rows must be backfilled;
+round SPRINT_ROUND is a sprint weekend and the standings pages add up every race and
+sprint, so the backfill can check its rebuilt standings against them.
+The rerun must also load every table from the table store instead of parsing pages,
+and a worksheet with more players than configured must be scored for all of them.
+When one scrape fails, its ranges are left as they were and the rest is still written.
+A week rebuilt from the checkpoint must score exactly as the standings do, ties included.
+Sprint pages are fetched only for sprint weekends, and only a 404 counts as no sprint.
+
+    python tests/offline_update.py [latency seconds per request]
+"""
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from fake_sheets import *
+
+import pandas as pd
+
+import gSheet_utils
+import predictions_updater
+import scraping_utils
+from fetch_utils import ENGINE, FetchError, run_scope
+from gSheet_utils import CLIENT, results_final_after
+from registry import REGISTRY
+from table_store import TableStore
+from wildcards import WildcardCheckpoint
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGES = {
+    "race-result": "race_result.html",
+    "qualifying": "qualifying.html",
+    "drivers": "drivers.html",
+    "team": "team.html",
+    "fastest-laps": "fastest_laps.html",
+}
+RACES = 3
+SPRINT_ROUND = 2  # its sprint-results page serves the race result fixture; other weekends' are not found
+# Rounds as named on the fastest-laps fixture, with China left out as a cancelled round.
+GRANDS_PRIX = ["Australia", "Japan", "Bahrain", "Saudi Arabia", "Miami"]
+
+# Sheets API requests allowed per worksheet for one update.
+READ_BUDGET = 1   # the snapshot
+WRITE_BUDGET = 1  # the flush
+
+
+def fixture_page(url: str) -> bytes:
+    """Serve a formula1.com URL from the saved fixture with the same page type."""
+    page = url.rstrip("/").rsplit("/", 1)[-1]
+    if page == "sprint-results":
+        if f"/{1000 + SPRINT_ROUND}/" not in url:
+            raise FetchError(f"HTTP 404 from {url}", status=404)
+        page = "race-result"
+    if page in ("drivers", "team"):
+        return standings_page(page)
+    with open(os.path.join(FIXTURES, PAGES[page]), "rb") as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=None)
+def standings_page(kind: str) -> bytes:
+    """Render the standings the fixture results add up to: RACES races and one sprint."""
+    results = scraping_utils.parse_first_table(fixture_page("race-result"))
+    key = "Driver" if kind == "drivers" else "Car"
+    # Every race finishes in the same order, so ties on points keep it, as countback would.
+    points = results.groupby(key, sort=False)["Pts"].sum().sort_values(ascending=False, kind="stable") * (RACES + 1)
+    cars = dict(zip(results["Driver"], results["Car"]))
+    if kind == "drivers":
+        header, rows = ["Pos", "Driver", "Nationality", "Car", "Pts"], [[name, name[-3:], cars[name], pts] for name, pts in points.items()]
+    else:
+        header, rows = ["Pos", "Team", "Pts"], [[team, pts] for team, pts in points.items()]
+    head = "".join(f"<th><p>{h}</p></th>" for h in header)
+    body = "".join("<tr>" + "".join(f"<td><p>{cell}</p></td>" for cell in [pos, *row]) + "</tr>"
+                   for pos, row in enumerate(rows, start=1))
+    return f"<html><body><table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table></body></html>".encode()
+
+
+def write_schedule(path: str, races: int = RACES) -> None:
+    """Write a schedule whose first `races` rounds have already started."""
+    start = datetime.now(timezone.utc) - timedelta(days=7 * races)
+    schedule = [{
+        "name": GRANDS_PRIX[n - 1].lower().replace(" ", "-"),
+        "date": (start + timedelta(days=7 * n)).strftime("%Y-%m-%d"),
+        "time": (start + timedelta(days=7 * n)).strftime("%Y-%m-%d %H:%M:%S"),
+        "raceweek": n,
+        "results": f"https://www.formula1.com/en/results/{YEAR}/races/{1000 + n}/{GRANDS_PRIX[n - 1].lower().replace(' ', '-')}/race-result",
+        # The last started round is left unflagged, as if scraped before sprints were, so its sprint page is looked up.
+        **({"sprint": n == SPRINT_ROUND} if n != races else {}),
+    } for n in range(1, races + 3)]
+    with open(path, "w") as f:
+        json.dump(schedule, f)
+
+
+def check_table_store(store: TableStore) -> None:
+    """Every fixture's table must come back from the store exactly as it was parsed."""
+    for name in PAGES.values():
+        url = f"https://example.invalid/{name}"
+        with open(os.path.join(FIXTURES, name), "rb") as f:
+            html = f.read()
+        parsed = scraping_utils.parse_first_table(html, url)
+        store.put(url, html, parsed)
+        stored = store._meta(url)
+        pd.testing.assert_frame_equal(store.get(url, html), parsed)
+        assert store._meta(url) == stored, "a hash hit rewrote the entry"
+        assert store.get(url, html + b" ") is None, "a changed page was served from the store"
+
+    # A page seen unchanged after its final time is served without its HTML from then on.
+    store.put(url, html, parsed)
+    time.sleep(0.01)
+    final_after = datetime.now(timezone.utc)
+    store.final_after = lambda page: final_after
+    assert store.get_final(url) is None, "a page stored before its final time was served as final"
+    store.get(url, html)
+    pd.testing.assert_frame_equal(store.get_final(url), parsed)
+    stored = store._meta(url)
+    store.get(url, html)
+    assert store._meta(url) == stored, "an entry already final was rewritten"
+
+
+def main(latency: float = 0.0) -> None:
+    workdir = tempfile.mkdtemp()
+    write_schedule(os.path.join(workdir, "race_schedule.json"))
+    gSheet_utils.SCHEDULE.path = os.path.join(workdir, "race_schedule.json")
+    predictions_updater.CHECKPOINT = WildcardCheckpoint(os.path.join(workdir, "wildcards.json"))
+    ENGINE.cache = None
+    ENGINE.fetch = fixture_page
+    scraping_utils.TABLE_STORE = TableStore(os.path.join(workdir, "tables"), final_after=results_final_after)
+
+    client = league_client(LEAGUES, raceweek=RACES, latency=latency)
+    CLIENT.use(client)
+
+    start = time.time()
+    written = predictions_updater.update()
+    elapsed = time.time() - start
+
+    for (key, index), raceweek in written.items():
+        ws = client.spreadsheets[key].get_worksheet(index)
+        logger.info("%s: raceweek %s, %d reads, %d writes %s", ws.title, raceweek, ws.reads, ws.writes,
+                    [method for method, _ in ws.calls])
+        assert raceweek == RACES, f"{ws.title} was not updated"
+        assert ws.reads <= READ_BUDGET, f"{ws.title}: {ws.reads} reads, budget {READ_BUDGET}"
+        assert ws.writes <= WRITE_BUDGET, f"{ws.title}: {ws.writes} writes, budget {WRITE_BUDGET}"
+
+        # The tracker row for this raceweek holds each player's total, as the sheet's formulas add it up.
+        for i, cell in enumerate(PLAYERS_POINTS):
+            target = POINTS_TRACKER.offset_cell(row_offset=RACES, col_offset=i)
+            assert ws.evaluate(*target.to_tuple()) == ws.evaluate(cell.row, cell.column)
+            # Earlier raceweeks, which no run wrote, are backfilled in the same flush.
+            for raceweek in range(1, RACES):
+                earlier = POINTS_TRACKER.offset_cell(row_offset=raceweek, col_offset=i)
+                assert ws.get_value(*earlier.to_tuple()) != "", f"{ws.title}: raceweek {raceweek} not backfilled"
+
+    # The run report counts the same Sheets requests the fake served.
+    with open(PERF_LOG) as f:
+        report = json.loads(f.readlines()[-1])
+    requests = client.requests()
+    assert (report["sheets"]["reads"], report["sheets"]["writes"]) == (requests["reads"], requests["writes"]), report["sheets"]
+
+    logger.info("Offline update: %s requests in %.2fs (latency %ss)", requests, elapsed, latency)
+
+    # Nothing changed since: the second run must not write at all.
+    for ws in client.worksheets():
+        ws.reset_counts()
+    assert all(raceweek == RACES for raceweek in predictions_updater.update().values())
+    for ws in client.worksheets():
+        assert ws.writes == 0, f"{ws.title}: unchanged run sent {ws.calls}"
+    with open(PERF_LOG) as f:
+        report = json.loads(f.readlines()[-1])
+    assert report["parse"]["pages"] == 0 and report["parse"]["stored"] > 0, report["parse"]
+
+    check_table_store(TableStore(os.path.join(workdir, "check")))
+
+    # Fastest laps are credited by Grand Prix, not by row position.
+    laps = scraping_utils.parse_first_table(fixture_page("fastest-laps"))
+    for race in gSheet_utils.get_started_races():
+        driver = laps.loc[laps["Grand Prix"] == GRANDS_PRIX[race["raceweek"] - 1], "Driver"].iloc[0]
+        assert (predictions_updater.CHECKPOINT.matrix([race], "fastest_lap")[0] == REGISTRY.count([driver])).all(), race["name"]
+    logger.info("Unchanged rerun: %s requests", client.requests())
+
+    # A player added on the sheet, but not to PLAYERS, is scored and tracked like the others.
+    players = PLAYERS + ["Extra"]
+    layout = sheet_layout(len(players))
+    ws = seed_worksheet(FakeWorksheet("Five players"), raceweek=RACES, players=players)
+    assert predictions_updater.update_worksheet(ws) == RACES
+    assert ws.reads <= READ_BUDGET and ws.writes <= WRITE_BUDGET, ws.calls
+    for i, cell in enumerate(layout.players_points):
+        target = layout.points_tracker.offset_cell(row_offset=RACES, col_offset=i)
+        assert ws.evaluate(*target.to_tuple()) == ws.evaluate(cell.row, cell.column), players[i]
+    logger.info("%d-player sheet: %d reads, %d writes", len(players), ws.reads, ws.writes)
+
+    check_backfill_matches_standings()
+    check_failed_scrape(workdir)
+    check_sprint_fetches(workdir)
+
+
+def check_backfill_matches_standings() -> None:
+    """A week rebuilt from the checkpoint scores as the scraped standings do, ties on points included."""
+    ws = seed_worksheet(FakeWorksheet("Week after"), raceweek=RACES + 1)
+    assert predictions_updater.update_worksheet(ws) == RACES + 1
+    # Nothing has run since race RACES, so its rebuilt row must equal the totals scored from the standings.
+    for i in range(len(PLAYERS)):
+        rebuilt, scored = (ws.evaluate(*POINTS_TRACKER.offset_cell(row_offset=week, col_offset=i).to_tuple())
+                           for week in (RACES, RACES + 1))
+        assert rebuilt == scored, f"{PLAYERS[i]}: raceweek {RACES} rebuilt as {rebuilt}, standings score {scored}"
+    logger.info("Backfilled raceweek %d matches the standings-based totals.", RACES)
+
+
+def check_failed_scrape(workdir: str) -> None:
+    """A failed fastest-laps scrape leaves its wildcard row and the tracker row; standings and the rest are flushed."""
+    predictions_updater.CHECKPOINT = WildcardCheckpoint(os.path.join(workdir, "failed.json"))
+    def fetch(url: str) -> bytes:
+        if url.endswith("fastest-laps"):
+            raise FetchError(f"HTTP 503 from {url}", status=503)
+        return fixture_page(url)
+    ENGINE.fetch = fetch
+    ws = seed_worksheet(FakeWorksheet("Failed scrape"), raceweek=RACES)
+    assert predictions_updater.update_worksheet(ws) == RACES, "the sheet was not flushed"
+    assert ws.writes == 1, ws.calls
+
+    key_col = WDC.width[0] + 1
+    assert any(ws.get_value(WDC.header + 2 + k, key_col + 1) for k in range(TOT_DRIVERS)), "standings not written"
+    wc_row = WILDCARD_POINTS.header + 2
+    assert ws.get_value(wc_row + FLS.wildcard_index, 3) == "", "fastest lap row written without data"
+    assert ws.get_value(wc_row + DNFS.wildcard_index, 3) != "", "DNF row not written"
+    assert ws.get_value(*POINTS_TRACKER.offset_cell(row_offset=RACES).to_tuple()) == "", "tracker written from partial wildcards"
+    ENGINE.fetch = fixture_page
+    logger.info("Failed fastest-laps scrape: other ranges flushed in %d write.", ws.writes)
+
+
+def check_sprint_fetches(workdir: str) -> None:
+    """Sprint pages are fetched only for sprint (or unflagged) weekends, and a failed one is not taken as no sprint."""
+    predictions_updater.CHECKPOINT = WildcardCheckpoint(os.path.join(workdir, "sprints.json"))
+    store, scraping_utils.TABLE_STORE = scraping_utils.TABLE_STORE, None  # fetch every page
+    fetched = []
+    def fetch(url: str) -> bytes:
+        fetched.append(url)
+        if url.endswith("sprint-results") and f"/{1000 + SPRINT_ROUND}/" in url:
+            raise FetchError(f"HTTP 503 from {url}", status=503)
+        return fixture_page(url)
+    ENGINE.fetch = fetch
+    with run_scope():
+        predictions_updater.calculate_DNFs_and_podiums()
+    sprints = sorted(url.split("/")[-3] for url in fetched if url.endswith("sprint-results"))
+    assert sprints == [str(1000 + SPRINT_ROUND), str(1000 + RACES)], sprints
+    races = gSheet_utils.get_started_races()
+    checkpoint = predictions_updater.CHECKPOINT
+    assert checkpoint.recorded(races[0], "sprint_points"), "round before the failed sprint not recorded"
+    assert not any(checkpoint.recorded(race, "sprint_points") for race in races[SPRINT_ROUND - 1:]), \
+        "failed sprint recorded as no sprint"
+    ENGINE.fetch, scraping_utils.TABLE_STORE = fixture_page, store
+    logger.info("Sprint pages fetched for rounds %s; the failed one left unrecorded.", sprints)
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.0)
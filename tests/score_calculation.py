@@ -13,17 +13,15 @@ from gspread_dataframe import get_as_dataframe
 import random
 import string
 
-from src.config import *
-from src.gSheet_utils import  *
-from src.scraping_utils import *
+# Runs offline against a seeded in-memory sheet (see fake_sheets.py); no credentials needed.
+from fake_sheets import *
 
 
-sh = authorize_google_sheet(CREDS, sskey)
-predictions_sheet = sh.get_worksheet(CURRENT_SHEET)
+predictions_sheet = league_client(LEAGUES).spreadsheets[sskey].get_worksheet(CURRENT_SHEET)
 
-scoreboard=get_table(predictions_sheet,SCOREBOARD)
-driver_standings=get_table(predictions_sheet,WDC)
-team_standings=get_table(predictions_sheet,WCC)
+scoreboard=SCOREBOARD.get_table(predictions_sheet)
+driver_standings=WDC.get_table(predictions_sheet)
+team_standings=WCC.get_table(predictions_sheet)
 
 driver_positions = {NAME_CONVERSION.get(str(r["Driver"])[-3:]): i for i, r in driver_standings.iterrows()}
 team_positions = {NAME_CONVERSION.get(str(r["Team"])): i for i, r in team_standings.iterrows()}
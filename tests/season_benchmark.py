@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the scoring and wildcard pipelines on synthetic seasons.
+
+Generates seasons of several sizes (races, drivers, players) with no network or
+sheet access, times prediction scoring, wildcard row ranking, wildcard count and
+rank building, results-page table parsing, loading the same tables from the
+table store, and the points tracker backfill of every raceweek, and compares each timing with the
+stored baseline. A case slower than TOLERANCE x its baseline fails the run.
+
+    python tests/season_benchmark.py [--repeats N] [--save-baseline]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from config import *
+from gSheet_utils import SCHEDULE
+from predictions_updater import calulate_prediction_scores, update_wildcard_row, wildcard_table
+from registry import REGISTRY
+from scoring import weekly_totals
+from scraping_utils import extract_dnf_counts, extract_podium_counts, extract_points, parse_first_table
+from table_store import TableStore
+from tables import DNFS, PODIUMS, SCOREBOARD, WILDCARD_POINTS
+from wildcards import WildcardCheckpoint
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+TOLERANCE = 3.0     # allowed slowdown over the baseline before a case fails
+NOISE_FLOOR = 1e-3  # seconds; differences below this are timer noise
+
+# Run smallest first: synthetic drivers are added to the process-wide REGISTRY and stay there.
+SIZES = {
+    "small": {"races": 5, "drivers": 20, "players": 4},
+    "medium": {"races": 24, "drivers": 30, "players": 50},
+    "large": {"races": 24, "drivers": 60, "players": 300},
+}
+
+
+@dataclass
+class Season:
+    """
+    A synthetic season.
+
+    Attributes:
+        races (List[dict]): Schedule entries.
+        pages (List[bytes]): Results page HTML per race.
+        results (List[pd.DataFrame]): Parsed results table per race.
+        scoreboard (pd.DataFrame): SCOREBOARD table with one column pair per player.
+        wildcards (pd.DataFrame): WILDCARD_POINTS table with one column pair per player.
+        driver_positions (np.ndarray): Championship position per registry ID.
+        team_positions (np.ndarray): Constructors position per registry ID.
+        store (TableStore): Table store holding every results table, with every race final.
+    """
+    races: List[dict]
+    pages: List[bytes]
+    results: List[pd.DataFrame]
+    scoreboard: pd.DataFrame
+    wildcards: pd.DataFrame
+    driver_positions: np.ndarray
+    team_positions: np.ndarray
+    store: TableStore
+
+
+def synthetic_drivers(count: int) -> List[str]:
+    """Return `count` driver cells as the results pages print them ("NameCODE"), registering extra drivers."""
+    codes = list(NAME_CONVERSION)[:TOT_DRIVERS]
+    for n in range(len(codes), count):
+        code = f"Z{n:02d}"
+        REGISTRY.add(code, f"Synthetic {n:02d}")
+        codes.append(code)
+    return [f"{REGISTRY.name(code)}{code}" for code in codes[:count]]
+
+
+def results_page(rows: List[List[str]]) -> bytes:
+    """Render a results table the way formula1.com lays it out."""
+    header = "".join(f"<th><p>{h}</p></th>" for h in ["Pos", "No", "Driver", "Car", "Laps", "Time/retired", "Pts"])
+    body = "".join("<tr>" + "".join(f"<td><p>{cell}</p></td>" for cell in row) + "</tr>" for row in rows)
+    return f"<html><body><table><thead><tr>{header}</tr></thead><tbody>{body}</tbody></table></body></html>".encode()
+
+
+def synthetic_season(races: int, drivers: int, players: int, seed: int = 0) -> Season:
+    """Generate a season's pages, results and sheet tables."""
+    rng = random.Random(seed)
+    grid = synthetic_drivers(drivers)
+    names = [REGISTRY.name(d) for d in grid]
+    teams = REGISTRY.teams
+
+    schedule, pages = [], []
+    for n in range(1, races + 1):
+        order = rng.sample(grid, len(grid))
+        rows = [[str(pos), str(pos), driver, rng.choice(teams), "57",
+                 "DNF" if rng.random() < 0.1 else f"+{pos * 1.7:.3f}s", str(max(0, 26 - pos))]
+                for pos, driver in enumerate(order, start=1)]
+        pages.append(results_page(rows))
+        schedule.append({"raceweek": n, "name": f"Grand Prix {n}",
+                         "results": f"https://www.formula1.com/en/results/{YEAR}/races/{n}/gp-{n}/race-result"})
+
+    scoreboard = {}
+    wildcards = {"Wildcards": ["Pole positions", "Fastest Laps", "Podiums", "DNFs", "Bonus"]}
+    for p in range(players):
+        picks = rng.sample(names, min(PREDICTION_DRIVERS, len(names))) + rng.sample(teams, len(teams))
+        picks = (picks + [""] * SCOREBOARD.length)[:SCOREBOARD.length]
+        scoreboard[f"Player {p}"], scoreboard[f"Player {p} score"] = picks, [0] * len(picks)
+        wildcards[f"Player {p}"] = [rng.choice(names) for _ in range(WILDCARD_POINTS.length)]
+        wildcards[f"Player {p} score"] = [None] * WILDCARD_POINTS.length
+
+    driver_positions = np.full(len(REGISTRY), -1, dtype=np.int64)
+    driver_positions[REGISTRY.resolve_many(rng.sample(names, len(names)))] = np.arange(len(names))
+    team_positions = np.full(len(REGISTRY), -1, dtype=np.int64)
+    team_positions[REGISTRY.team_ids] = rng.sample(range(len(teams)), len(teams))
+
+    results = [parse_first_table(page) for page in pages]
+    store = TableStore(tempfile.mkdtemp(), final_after=lambda url: datetime.fromtimestamp(0, timezone.utc))
+    for race, page, df in zip(schedule, pages, results):
+        store.put(race["results"], page, df)
+
+    return Season(races=schedule, pages=pages, results=results,
+                  scoreboard=pd.DataFrame(scoreboard), wildcards=pd.DataFrame(wildcards),
+                  driver_positions=driver_positions, team_positions=team_positions, store=store)
+
+
+## Cases ##
+
+def score_predictions(season: Season) -> None:
+    calulate_prediction_scores(season.scoreboard, season.driver_positions, season.team_positions)
+
+
+def rank_wildcard_rows(season: Season) -> None:
+    table = wildcard_table(REGISTRY.count(df["Driver"].iloc[0] for df in season.results), "Count")
+    wc_df = season.wildcards
+    for row in range(4):
+        wc_df = update_wildcard_row(wc_df, row, table, src="benchmark")
+
+
+def build_wildcard_counts(season: Season) -> None:
+    checkpoint = WildcardCheckpoint(os.path.join(tempfile.gettempdir(), "season_benchmark.json"))
+    for race, df in zip(season.races, season.results):
+        checkpoint.record(race, dnfs=extract_dnf_counts(df), podiums=extract_podium_counts(df))
+    wildcard_table(checkpoint.totals(season.races, "dnfs"), "DNF Count")
+    wildcard_table(checkpoint.totals(season.races, "podiums"), "Podium Count")
+
+
+def load_stored_tables(season: Season) -> None:
+    for race in season.races:
+        season.store.get_final(race["results"])
+
+
+def backfill_every_week(season: Season) -> None:
+    points = np.cumsum([extract_points(df) for df in season.results], axis=0)
+    dnfs = np.cumsum([extract_dnf_counts(df) for df in season.results], axis=0)
+    podiums = np.cumsum([extract_podium_counts(df) for df in season.results], axis=0)
+    weekly_totals(season.scoreboard, season.wildcards, points, {PODIUMS.wildcard_index: podiums, DNFS.wildcard_index: dnfs})
+
+
+def parse_results_pages(season: Season) -> None:
+    for page in season.pages:
+        parse_first_table(page)
+
+
+CASES: Dict[str, Callable[[Season], None]] = {
+    "prediction_scores": score_predictions,
+    "wildcard_rows": rank_wildcard_rows,
+    "wildcard_counts": build_wildcard_counts,
+    "parse_tables": parse_results_pages,
+    "load_tables": load_stored_tables,
+    "tracker_backfill": backfill_every_week,
+}
+
+
+def best_time(func: Callable[[Season], None], season: Season, repeats: int) -> float:
+    """Return the fastest of `repeats` calls, the least noisy estimate of the cost."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(season)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(repeats: int = 5, save_baseline: bool = False) -> int:
+    try:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    timings, regressions = {}, []
+    SCHEDULE.path = os.path.join(tempfile.mkdtemp(), "race_schedule.json")
+    for size, params in SIZES.items():
+        season = synthetic_season(**params)
+        with open(SCHEDULE.path, "w") as f:
+            json.dump(season.races, f)
+        for case, func in CASES.items():
+            key = f"{size}/{case}"
+            timings[key] = elapsed = best_time(func, season, repeats)
+            base = baseline.get(key)
+            if base is None:
+                logger.info("%-26s %8.2f ms", key, elapsed * 1000)
+                continue
+            logger.info("%-26s %8.2f ms (baseline %.2f ms, x%.2f)", key, elapsed * 1000, base * 1000, elapsed / base)
+            if elapsed > base * TOLERANCE and elapsed - base > NOISE_FLOOR:
+                regressions.append(key)
+
+    if save_baseline:
+        with open(BASELINE, "w") as f:
+            json.dump({key: round(t, 6) for key, t in timings.items()}, f, indent=2)
+        logger.info("Baseline saved to %s", BASELINE)
+        return 0
+    if regressions:
+        logger.error("REGRESSION: %s slower than %.1fx baseline", ", ".join(regressions), TOLERANCE)
+        return 1
+    logger.info("All %d cases within %.1fx of baseline.", len(timings), TOLERANCE)
+    return 0
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the stored baseline with this run")
+    args = parser.parse_args()
+    sys.exit(main(args.repeats, args.save_baseline))
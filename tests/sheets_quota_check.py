@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Load check of the Sheets rate limiter and retry layer.
+
+Several threads send requests through QuotaHTTPClient to a simulated Sheets server
+that answers 429 once a rolling window holds more than its quota, and fails a few
+requests with 503. The window is shortened to a couple of seconds so the run is quick.
+With the limiter in front, every request must succeed, none may be throttled, and
+throughput must come close to the quota.
+
+    python tests/sheets_quota_check.py [threads] [requests per thread]
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import sheets_quota
+from config import *
+from sheets_quota import QuotaHTTPClient, SheetsQuota
+
+PERIOD = 2.0       # seconds standing in for the quota minute
+QUOTA = 40         # requests per window, per method group
+ERROR_RATE = 0.05  # share of requests failing with 503
+
+
+class ThrottlingSession:
+    """A requests session stand-in that enforces a rolling-window quota per read/write group."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.sent = {"GET": deque(), "POST": deque()}
+        self.throttled = 0
+        self.errors = 0
+        self.ok = 0
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        now = time.monotonic()
+        with self.lock:
+            window = self.sent["GET" if method == "GET" else "POST"]
+            while window and window[0] <= now - PERIOD:
+                window.popleft()
+            window.append(now)
+            if len(window) > QUOTA:
+                self.throttled += 1
+                return response(429, "RESOURCE_EXHAUSTED")
+            if random.random() < ERROR_RATE:
+                self.errors += 1
+                return response(503, "UNAVAILABLE")
+            self.ok += 1
+        return response(200)
+
+
+def response(status: int, reason: str = "") -> requests.Response:
+    r = requests.Response()
+    r.status_code = status
+    body = {"error": {"code": status, "message": reason, "status": reason}} if status >= 400 else {}
+    r._content = json.dumps(body).encode()
+    return r
+
+
+def main(threads: int = 8, per_thread: int = 20) -> None:
+    random.seed(1)
+    # Shorter windows and backoffs than production, so the check takes seconds.
+    QuotaHTTPClient.quota = SheetsQuota(QUOTA, QUOTA, burst=SHEETS_BURST, period=PERIOD)
+    sheets_quota.SHEETS_BACKOFF_BASE = 0.05
+
+    session = ThrottlingSession()
+    client = QuotaHTTPClient(auth=None, session=session)  # type: ignore
+
+    def worker(n: int) -> None:
+        for i in range(per_thread):
+            client.request("GET" if (n + i) % 2 else "POST", "https://sheets.googleapis.com/v4/spreadsheets/x")
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, range(threads)))
+    elapsed = time.monotonic() - start
+
+    total = threads * per_thread
+    # Best possible: a full bucket, then the refill rate, for each of the two method groups.
+    ideal = max(0.0, (total / 2 - SHEETS_BURST) / ((QUOTA - SHEETS_BURST) / PERIOD))
+    logger.info("%d requests in %.2fs (ideal %.2fs): %d ok, %d throttled, %d server errors retried",
+                total, elapsed, ideal, session.ok, session.throttled, session.errors)
+    assert session.ok == total, "some requests never succeeded"
+    assert session.throttled == 0, f"{session.throttled} requests were throttled"
+    assert elapsed < ideal * 1.5 + 1.0, "limiter runs well below the quota"
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main(*(int(a) for a in sys.argv[1:3]))
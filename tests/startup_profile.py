@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Cold-start profile of the entry points.
+
+Imports each entry module in a fresh interpreter with `-X importtime`, reports its
+cumulative import time and slowest imports, and compares it with the stored baseline.
+A module slower than TOLERANCE x its baseline fails the run. The scheduler's
+`--check` command must also answer within CHECK_BUDGET of a bare interpreter
+start and must not load any of the HEAVY libraries.
+
+    python tests/startup_profile.py [--repeats N] [--save-baseline]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+from config import *
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+TOLERANCE = 3.0      # allowed slowdown over the baseline before a module fails
+NOISE_FLOOR = 0.02   # seconds; differences below this are startup noise
+CHECK_BUDGET = 0.1   # seconds the --check command may add to a bare interpreter start
+
+ENTRIES = ["scheduler", "gSheet_utils", "scraping_utils", "predictions_updater"]
+HEAVY = {"pandas", "numpy", "gspread", "gspread_dataframe", "google", "urllib3", "requests", "bs4", "lxml"}
+
+
+def import_profile(*args: str) -> List[Tuple[str, int, float, float]]:
+    """
+    Run python -X importtime with args from src/.
+
+    Returns:
+        List[Tuple[str, int, float, float]]: (module, nesting depth, self seconds, cumulative seconds) per import.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=SRC,
+                            capture_output=True, text=True, check=True)
+    profile = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        profile.append((name.strip(), depth, int(own) / 1e6, int(cumulative) / 1e6))
+    return profile
+
+
+def entry_import(profile: List[Tuple[str, int, float, float]], module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """Return a top-level import's cumulative seconds and its direct imports with theirs, slowest first."""
+    # -X importtime lists an import's children just before it.
+    end = next(i for i, (name, depth, _, _) in enumerate(profile) if name == module and depth == 0)
+    start = end
+    while start > 0 and profile[start - 1][1] > 0:
+        start -= 1
+    children = [(name, cumulative) for name, depth, _, cumulative in profile[start:end] if depth == 1]
+    return profile[end][3], sorted(children, key=lambda child: -child[1])
+
+
+def wall_time(args: List[str], repeats: int) -> float:
+    """Return the fastest of `repeats` runs of python with args from src/."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=SRC, capture_output=True, check=False)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(repeats: int = 5, save_baseline: bool = False) -> int:
+    try:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    timings, failures = {}, []
+    for module in ENTRIES:
+        elapsed, children = min((entry_import(import_profile("-c", f"import {module}"), module) for _ in range(repeats)),
+                                key=lambda run: run[0])
+        timings[module] = elapsed
+        base = baseline.get(module)
+        logger.info("%-20s %8.1f ms%s  slowest: %s", module, elapsed * 1000,
+                    f" (baseline {base * 1000:.1f} ms, x{elapsed / base:.2f})" if base else "",
+                    ", ".join(f"{name} {c * 1000:.0f} ms" for name, c in children[:3]))
+        if base and elapsed > base * TOLERANCE and elapsed - base > NOISE_FLOOR:
+            failures.append(f"import {module} slower than {TOLERANCE}x baseline")
+
+    # The health check path: fast, and clear of the libraries only updates need.
+    loaded = {name.split(".")[0] for name, _, _, _ in import_profile("scheduler.py", "--check")}
+    if loaded & HEAVY:
+        failures.append(f"scheduler --check loads {sorted(loaded & HEAVY)}")
+    check = wall_time(["scheduler.py", "--check"], repeats) - wall_time(["-c", "pass"], repeats)
+    logger.info("scheduler --check     %8.1f ms over interpreter start (budget %.0f ms)", check * 1000, CHECK_BUDGET * 1000)
+    if check > CHECK_BUDGET:
+        failures.append(f"scheduler --check took {check * 1000:.0f} ms")
+
+    if save_baseline:
+        with open(BASELINE, "w") as f:
+            json.dump({module: round(t, 4) for module, t in timings.items()}, f, indent=2)
+        logger.info("Baseline saved to %s", BASELINE)
+    if failures:
+        logger.error("STARTUP REGRESSION: %s", "; ".join(failures))
+        return 1
+    logger.info("All %d entry points within %.1fx of baseline.", len(timings), TOLERANCE)
+    return 0
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the stored baseline with this run")
+    args = parser.parse_args()
+    sys.exit(main(args.repeats, args.save_baseline))
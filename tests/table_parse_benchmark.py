@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark of first-table extraction against the saved formula1.com page fixtures.
+
+Checks that scraping_utils.parse_first_table returns exactly what the previous
+BeautifulSoup + pd.read_html(flavor="bs4") double parse returned, then times both.
+
+    python tests/table_parse_benchmark.py [repeats]
+"""
+import os
+import sys
+import time
+from io import StringIO
+
+import bs4 as bs
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from config import *
+from scraping_utils import parse_first_table
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGES = ["race_result.html", "qualifying.html", "drivers.html", "team.html", "fastest_laps.html"]
+
+
+def legacy_parse_first_table(html: bytes) -> pd.DataFrame:
+    """The previous implementation: full bs4/lxml parse, then read_html re-parses the table."""
+    soup = bs.BeautifulSoup(html, "lxml")
+    tables = soup.find_all("table")
+    return pd.read_html(StringIO(str(tables[0])), flavor="bs4", header=[0])[0]
+
+
+def time_per_call(func, html: bytes, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(html)
+    return (time.perf_counter() - start) / repeats
+
+
+def main(repeats: int = 20) -> None:
+    old_total = new_total = 0.0
+    for page in PAGES:
+        with open(os.path.join(FIXTURES, page), "rb") as f:
+            html = f.read()
+        pd.testing.assert_frame_equal(legacy_parse_first_table(html), parse_first_table(html))
+        old = time_per_call(legacy_parse_first_table, html, repeats)
+        new = time_per_call(parse_first_table, html, repeats)
+        old_total += old
+        new_total += new
+        logger.info("%-18s %7.2f ms -> %6.2f ms (x%.1f)", page, old * 1000, new * 1000, old / new)
+
+    # A run parses ~48 results/qualifying pages plus the three standings pages.
+    per_page_old, per_page_new = old_total / len(PAGES), new_total / len(PAGES)
+    logger.info("Identical output on %d pages. Estimated 51-page run: %.2fs -> %.2fs",
+                len(PAGES), per_page_old * 51, per_page_new * 51)
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)